@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import argparse
 import subprocess
@@ -6,6 +7,10 @@ import re
 import ast
 from typing import List, Dict, Any, Optional
 
+from .budget import Budget, prioritize
+from .config import ScratchbotConfig
+from .file_scan import MAX_FILE_SIZE, FileScan, scan_file
+
 TS_PARSER = os.path.join(os.path.dirname(__file__), 'ts_parser.js')
 
 try:
@@ -16,6 +21,7 @@ except Exception:
     _NODE_MODULES = ''
 
 SKIP_DIRS = {'node_modules', 'dist', 'build', '.git', '__pycache__'}
+DEPENDENCY_FILES = ('package-lock.json', 'pnpm-lock.yaml', 'requirements.txt')
 
 def non_blank_lines(text: str) -> int:
     return sum(1 for line in text.splitlines() if line.strip())
@@ -29,7 +35,7 @@ def analyze_js_ts_file(path: str) -> Dict[str, Any]:
         data = json.loads(out)
         return data
     except Exception:
-        return {'exports': {'functions': [], 'classes': [], 'interfaces': []}, 'lines': non_blank_lines(open(path).read()), 'routes': []}
+        return {'exports': {'functions': [], 'classes': [], 'interfaces': []}, 'lines': scan_file(path, None).non_blank, 'routes': []}
 
 class PyAnalyzer(ast.NodeVisitor):
     def __init__(self):
@@ -71,13 +77,14 @@ class PyAnalyzer(ast.NodeVisitor):
                     return arg.value
         return None
 
-def analyze_py_file(path: str) -> Dict[str, Any]:
-    with open(path, 'r', encoding='utf-8') as f:
-        text = f.read()
-    tree = ast.parse(text)
+def analyze_py_file(path: str, scan: Optional[FileScan] = None) -> Dict[str, Any]:
+    if scan is None:
+        scan = scan_file(path, None)
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read())
     analyzer = PyAnalyzer()
     analyzer.visit(tree)
-    return {'exports': {'functions': analyzer.functions, 'classes': analyzer.classes}, 'lines': non_blank_lines(text), 'routes': analyzer.routes}
+    return {'exports': {'functions': analyzer.functions, 'classes': analyzer.classes}, 'lines': scan.non_blank, 'routes': analyzer.routes}
 
 def parse_package_lock(path: str) -> List[str]:
     try:
@@ -104,7 +111,9 @@ def parse_pnpm_lock(path: str) -> List[str]:
             if in_deps:
                 if not line.startswith('  '):
                     break
-                name = line.strip().split(':')[0]
+                if line.startswith('   '):
+                    continue  # v6 nests specifier/version under each package
+                name = line.strip().split(':')[0].strip('\'"')
                 if name:
                     deps.append(name)
         return deps
@@ -126,80 +135,263 @@ def parse_requirements(path: str) -> List[str]:
         pass
     return deps
 
-def analyze_repo(root: str, baseline_path: Optional[str] = None) -> Dict[str, Any]:
-    js_results = []
-    py_results = []
-    missing_docs = set()
-    dir_info: Dict[str, Dict[str, Any]] = {}
-    snapshot_functions: Dict[str, Dict[str, str]] = {}
-    snapshot_routes: Dict[str, List[str]] = {}
+def _is_tracked_source(filename: str) -> bool:
+    if filename.startswith('_'):
+        return False
+    if filename.endswith(('.ts', '.js')) and not filename.endswith('.d.ts'):
+        return True
+    return filename.endswith('.py')
+
+def _is_readme(filename: str) -> bool:
+    return filename.lower() in ('readme.md', 'index.md')
+
+def _is_skipped_rel(relpath: str, is_dir: bool = False) -> bool:
+    if relpath == os.curdir:
+        return False
+    parts = relpath.split(os.sep)
+    if not is_dir:
+        parts = parts[:-1]
+    return any(p in SKIP_DIRS or p.startswith('.') for p in parts)
+
+class RepoState:
+    """In-memory analysis state for a repository.
 
-    root = os.path.abspath(root)
+    ``scan`` performs a full walk; ``update`` re-analyzes only the given
+    paths and keeps the directory rollups and baseline comparison in sync,
+    so long-running callers (``--watch``) avoid rescanning the whole tree.
 
-    for dirpath, dirnames, filenames in os.walk(root):
-        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
-        has_readme = any(name.lower() in ('readme.md', 'index.md') for name in filenames)
-        dir_info[dirpath] = {'lines': 0, 'has_readme': has_readme}
+    Files that are binary, minified, generated or larger than
+    ``max_file_size`` bytes are never handed to a parser; they are listed
+    under ``skipped`` in the result instead.
 
-        for filename in filenames:
-            if filename.startswith('_'):
+    ``scan`` accepts a :class:`~scratchbot.budget.Budget`; files are then
+    analyzed in priority order (see :func:`~scratchbot.budget.prioritize`)
+    and those left when the budget runs out are reported in ``coverage``
+    with ``partial`` set, rather than failing the whole job. Pending files
+    are never compared against the baseline (they are listed under
+    ``coverage['unchecked_baseline']``). Directories with pending files are
+    listed under ``coverage['incomplete_dirs']`` since their line totals,
+    and so the directory-level ``missing_docs`` check, are lower bounds.
+    """
+
+    def __init__(self, root: str, baseline_path: Optional[str] = None, max_file_size: Optional[int] = MAX_FILE_SIZE):
+        self.root = os.path.abspath(root)
+        self.max_file_size = max_file_size
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.skipped: Dict[str, str] = {}
+        self.pending: Dict[str, None] = {}
+        self.kinds: Dict[str, str] = {}
+        self.dir_lines: Dict[str, int] = {}
+        self.dir_readme: Dict[str, bool] = {}
+        self.baseline: Dict[str, Any] = {}
+        self._needs_update: Dict[str, List[Dict[str, str]]] = {}
+        if baseline_path and os.path.exists(baseline_path):
+            with open(baseline_path, 'r', encoding='utf-8') as f:
+                self.baseline = json.load(f)
+
+    def scan(self, budget: Optional[Budget] = None, changed: Optional[List[str]] = None) -> None:
+        self.files.clear()
+        self.skipped.clear()
+        self.pending.clear()
+        self.kinds.clear()
+        self.dir_lines.clear()
+        self.dir_readme.clear()
+        candidates = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+            self.dir_readme[dirpath] = any(_is_readme(name) for name in filenames)
+            self.dir_lines[dirpath] = 0
+            for filename in filenames:
+                if _is_tracked_source(filename):
+                    candidates.append(os.path.relpath(os.path.join(dirpath, filename), self.root))
+        if budget is not None:
+            candidates = prioritize(candidates, changed or ())
+        for relpath in candidates:
+            if budget is not None:
+                if budget.exhausted:
+                    self.pending[relpath] = None
+                    continue
+                budget.charge()
+            self._add_file(os.path.join(self.root, relpath))
+        # files left pending were never read, so comparing them would
+        # report every baseline function as missing
+        self._needs_update = {
+            path: self._compare_baseline(path)
+            for path in self._baseline_paths() if path not in self.pending
+        }
+
+    def update(self, paths: List[str]) -> List[str]:
+        """Re-analyze ``paths`` (absolute or root-relative) after a change.
+
+        Deleted files and directories are dropped, new directories are
+        walked. Returns the root-relative paths whose analysis changed.
+        """
+        touched: List[str] = []
+        for path in paths:
+            path = os.path.join(self.root, path)
+            relpath = os.path.relpath(path, self.root)
+            is_dir = os.path.isdir(path)
+            if relpath.startswith('..') or _is_skipped_rel(relpath, is_dir):
                 continue
-            path = os.path.join(dirpath, filename)
-            relpath = os.path.relpath(path, root)
-            if filename.endswith(('.ts', '.js')) and not filename.endswith('.d.ts'):
-                data = analyze_js_ts_file(path)
-                data['path'] = relpath
+            if is_dir:
+                touched.extend(self._update_dir(path))
+            elif not os.path.exists(path) and path in self.dir_lines:
+                touched.extend(self._remove_dir(path))
+            else:
+                filename = os.path.basename(path)
+                dirpath = os.path.dirname(path)
+                if filename in DEPENDENCY_FILES and dirpath == self.root:
+                    # dependencies are re-read by result()
+                    touched.append(relpath)
+                elif _is_readme(filename):
+                    self.dir_readme[dirpath] = os.path.isdir(dirpath) and any(
+                        _is_readme(name) for name in os.listdir(dirpath)
+                    )
+                    touched.append(relpath)
+                elif _is_tracked_source(filename):
+                    if os.path.isfile(path):
+                        self.dir_lines.setdefault(dirpath, 0)
+                        self.dir_readme.setdefault(dirpath, False)
+                        if not self._refresh_file(path):
+                            continue
+                    else:
+                        self._remove_file(relpath)
+                    touched.append(relpath)
+        baseline_paths = self._baseline_paths()
+        for relpath in touched:
+            if relpath in baseline_paths:
+                self._needs_update[relpath] = self._compare_baseline(relpath)
+        return touched
+
+    def result(self) -> Dict[str, Any]:
+        js_results = []
+        py_results = []
+        missing_docs = set()
+        for relpath, data in self.files.items():
+            if self.kinds[relpath] == 'js':
                 js_results.append(data)
-                dir_info[dirpath]['lines'] += data['lines']
-                if data['lines'] > 300 and not has_readme:
-                    missing_docs.add(relpath)
-                if data['exports']['functions']:
-                    snapshot_functions.setdefault(relpath, {})
-                    for fn in data['exports']['functions']:
-                        snapshot_functions[relpath][fn['name']] = fn['signature']
-                if data['routes']:
-                    snapshot_routes[relpath] = data['routes']
-            elif filename.endswith('.py'):
-                data = analyze_py_file(path)
-                data['path'] = relpath
+            else:
                 py_results.append(data)
-                dir_info[dirpath]['lines'] += data['lines']
-                if data['lines'] > 300 and not has_readme:
-                    missing_docs.add(relpath)
-                if data['exports']['functions']:
-                    snapshot_functions.setdefault(relpath, {})
-                    for fn in data['exports']['functions']:
-                        snapshot_functions[relpath][fn['name']] = fn['signature']
-                if data['routes']:
-                    snapshot_routes[relpath] = data['routes']
-
-    # directory-level missing docs
-    for dirpath, info in dir_info.items():
-        rel = os.path.relpath(dirpath, root)
-        if rel == '.':
-            rel = '.'
-        if rel.count(os.sep) <= 1 and info['lines'] > 300 and not info['has_readme']:
-            missing_docs.add(rel)
-
-    dependencies = {}
-    pkg_lock = os.path.join(root, 'package-lock.json')
-    if os.path.exists(pkg_lock):
-        dependencies['npm'] = parse_package_lock(pkg_lock)
-    pnpm_lock = os.path.join(root, 'pnpm-lock.yaml')
-    if os.path.exists(pnpm_lock):
-        dependencies['npm'] = parse_pnpm_lock(pnpm_lock)
-    reqs = os.path.join(root, 'requirements.txt')
-    if os.path.exists(reqs):
-        dependencies['pip'] = parse_requirements(reqs)
-
-    needs_update = []
-    if baseline_path and os.path.exists(baseline_path):
-        with open(baseline_path, 'r', encoding='utf-8') as f:
-            baseline = json.load(f)
-        base_funcs = baseline.get('functions', {})
-        base_routes = baseline.get('routes', {})
-        for path, funcs in base_funcs.items():
-            current = snapshot_functions.get(path, {})
+            dirpath = os.path.dirname(os.path.join(self.root, relpath))
+            if data['lines'] > 300 and not self.dir_readme.get(dirpath):
+                missing_docs.add(relpath)
+
+        incomplete_dirs = sorted({os.path.dirname(p) or '.' for p in self.pending})
+
+        # directory-level missing docs; totals of incomplete directories are
+        # lower bounds, so a hit is still certain and a miss is only flagged
+        # through coverage['incomplete_dirs']
+        for dirpath, lines in self.dir_lines.items():
+            rel = os.path.relpath(dirpath, self.root)
+            if rel.count(os.sep) <= 1 and lines > 300 and not self.dir_readme.get(dirpath):
+                missing_docs.add(rel)
+
+        needs_update = []
+        for kind in ('functions', 'routes'):
+            for path in self.baseline.get(kind, {}):
+                needs_update.extend(
+                    item for item in self._needs_update.get(path, [])
+                    if (item['reason'] == 'routes changed') == (kind == 'routes')
+                )
+
+        return {
+            'js': js_results,
+            'python': py_results,
+            'dependencies': self._dependencies(),
+            'missing_docs': sorted(missing_docs),
+            'needs_update': needs_update,
+            'skipped': [{'path': p, 'reason': r} for p, r in sorted(self.skipped.items())],
+            'partial': bool(self.pending),
+            'coverage': {
+                'files_analyzed': len(self.files) + len(self.skipped),
+                'files_skipped': len(self.pending),
+                'incomplete_dirs': incomplete_dirs,
+                'unchecked_baseline': sorted(p for p in self._baseline_paths() if p in self.pending),
+            },
+        }
+
+    def _analyze(self, path: str):
+        scan = scan_file(path, self.max_file_size)
+        if scan.skipped:
+            return None, scan.skip_reason
+        if path.endswith('.py'):
+            return 'python', analyze_py_file(path, scan)
+        return 'js', analyze_js_ts_file(path)
+
+    def _add_file(self, path: str) -> None:
+        self._store(path, *self._analyze(path))
+
+    def _refresh_file(self, path: str) -> bool:
+        relpath = os.path.relpath(path, self.root)
+        try:
+            kind, data = self._analyze(path)
+        except OSError:
+            # gone between the event and the read (rename-saves, checkouts)
+            self._remove_file(relpath)
+            return True
+        except (SyntaxError, ValueError) as exc:
+            # keep the previous result while a file is mid-edit
+            print(f'scratchbot: skipping {relpath}: {exc}', file=sys.stderr)
+            return False
+        self._remove_file(relpath)
+        self._store(path, kind, data)
+        return True
+
+    def _store(self, path: str, kind: Optional[str], data: Any) -> None:
+        relpath = os.path.relpath(path, self.root)
+        if kind is None:
+            self.skipped[relpath] = data
+            return
+        data['path'] = relpath
+        self.files[relpath] = data
+        self.kinds[relpath] = kind
+        self.dir_lines[os.path.dirname(path)] += data['lines']
+
+    def _remove_file(self, relpath: str) -> None:
+        self.skipped.pop(relpath, None)
+        self.pending.pop(relpath, None)
+        data = self.files.pop(relpath, None)
+        self.kinds.pop(relpath, None)
+        if data is not None:
+            dirpath = os.path.dirname(os.path.join(self.root, relpath))
+            self.dir_lines[dirpath] -= data['lines']
+
+    def _update_dir(self, path: str) -> List[str]:
+        touched = []
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+            self.dir_readme[dirpath] = any(_is_readme(name) for name in filenames)
+            self.dir_lines.setdefault(dirpath, 0)
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                if _is_tracked_source(filename) and self._refresh_file(file_path):
+                    touched.append(os.path.relpath(file_path, self.root))
+        return touched
+
+    def _remove_dir(self, path: str) -> List[str]:
+        relpath = os.path.relpath(path, self.root)
+        prefix = relpath + os.sep
+        touched = [p for p in {**self.files, **self.skipped, **self.pending} if p.startswith(prefix)]
+        for p in touched:
+            self._remove_file(p)
+        for dirpath in [d for d in self.dir_lines if d == path or d.startswith(path + os.sep)]:
+            del self.dir_lines[dirpath]
+            self.dir_readme.pop(dirpath, None)
+        return touched
+
+    def _baseline_paths(self) -> Dict[str, None]:
+        paths = dict.fromkeys(self.baseline.get('functions', {}))
+        paths.update(dict.fromkeys(self.baseline.get('routes', {})))
+        return paths
+
+    def _compare_baseline(self, path: str) -> List[Dict[str, str]]:
+        needs_update = []
+        data = self.files.get(path)
+        funcs = self.baseline.get('functions', {}).get(path)
+        if funcs is not None:
+            current = {}
+            if data:
+                current = {fn['name']: fn['signature'] for fn in data['exports']['functions']}
             for name, sig in funcs.items():
                 if name not in current:
                     needs_update.append({'path': path, 'reason': f'missing function {name}'})
@@ -208,25 +400,81 @@ def analyze_repo(root: str, baseline_path: Optional[str] = None) -> Dict[str, An
             for name in current:
                 if name not in funcs:
                     needs_update.append({'path': path, 'reason': f'new function {name}'})
-        for path, routes in base_routes.items():
-            current = snapshot_routes.get(path, [])
-            if set(current) != set(routes):
+        routes = self.baseline.get('routes', {}).get(path)
+        if routes is not None:
+            current_routes = data['routes'] if data else []
+            if set(current_routes) != set(routes):
                 needs_update.append({'path': path, 'reason': 'routes changed'})
+        return needs_update
+
+    def _dependencies(self) -> Dict[str, List[str]]:
+        dependencies = {}
+        pkg_lock = os.path.join(self.root, 'package-lock.json')
+        if os.path.exists(pkg_lock):
+            dependencies['npm'] = parse_package_lock(pkg_lock)
+        pnpm_lock = os.path.join(self.root, 'pnpm-lock.yaml')
+        if os.path.exists(pnpm_lock):
+            dependencies['npm'] = parse_pnpm_lock(pnpm_lock)
+        reqs = os.path.join(self.root, 'requirements.txt')
+        if os.path.exists(reqs):
+            dependencies['pip'] = parse_requirements(reqs)
+        return dependencies
+
+def analyze_repo(
+    root: str,
+    baseline_path: Optional[str] = None,
+    max_file_size: Optional[int] = MAX_FILE_SIZE,
+    budget: Optional[Budget] = None,
+    changed: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Analyze ``root``; see :class:`RepoState` for the result layout.
 
-    return {
-        'js': js_results,
-        'python': py_results,
-        'dependencies': dependencies,
-        'missing_docs': sorted(missing_docs),
-        'needs_update': needs_update,
-    }
+    With a ``budget``, ``changed`` (repo-relative paths) and files near them
+    are analyzed first and the result may be ``partial``.
+    """
+    state = RepoState(root, baseline_path, max_file_size)
+    state.scan(budget, changed)
+    return state.result()
 
 def main():
     parser = argparse.ArgumentParser(description='Analyze repository')
     parser.add_argument('path', help='Path to repository')
     parser.add_argument('--baseline', help='Baseline JSON for comparison', default=None)
+    parser.add_argument('--watch', action='store_true', help='Keep running and re-analyze changed files')
+    parser.add_argument('--interval', type=float, default=1.0, help='Polling interval in seconds for --watch')
+    parser.add_argument('--poll', action='store_true', help='Force the polling watcher instead of inotify')
+    parser.add_argument('--socket', help='Serve the current result on this Unix socket in --watch mode', default=None)
+    parser.add_argument('--max-file-size', type=int, default=None,
+                        help='Skip source files larger than this many bytes '
+                             '(default: max_file_size from .scratchbot.yml, else %d)' % MAX_FILE_SIZE)
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='Stop analyzing after this many seconds and report a partial result')
+    parser.add_argument('--max-files', type=int, default=None,
+                        help='Analyze at most this many files and report a partial result')
+    parser.add_argument('--changed', action='append', default=[],
+                        help='Changed path to analyze first (repeatable)')
+    parser.add_argument('--dependency-metadata', action='store_true',
+                        help='Resolve dependency names to registry metadata (cached)')
+    parser.add_argument('--offline', action='store_true',
+                        help='Resolve dependency metadata from the local mirror and cache only')
     args = parser.parse_args()
-    result = analyze_repo(args.path, args.baseline)
+    if args.max_file_size is None:
+        config = ScratchbotConfig.from_file(os.path.join(args.path, '.scratchbot.yml'))
+        args.max_file_size = config.max_file_size
+    if args.watch:
+        from .watch import watch_repo
+        watch_repo(args.path, args.baseline, interval=args.interval, socket_path=args.socket,
+                   force_poll=args.poll, max_file_size=args.max_file_size)
+        return
+    budget = None
+    if args.deadline is not None or args.max_files is not None:
+        budget = Budget(args.deadline, args.max_files)
+    result = analyze_repo(args.path, args.baseline, args.max_file_size, budget, args.changed)
+    if args.dependency_metadata:
+        from .deps import fetch_dependency_metadata
+        result['dependency_metadata'] = fetch_dependency_metadata(
+            result['dependencies'], offline=args.offline or None
+        )
     print(json.dumps(result, indent=2))
 
 if __name__ == '__main__':
@@ -0,0 +1,77 @@
+"""Time and work budgets for analysis steps.
+
+A :class:`Budget` is passed to :func:`~scratchbot.analyze.analyze_repo` and
+:func:`~scratchbot.plan_builder.assemble_context` so a pathological repository
+yields a partial result instead of running until the worker is killed. The
+same instance can be shared by both steps to bound a whole job.
+
+Files are processed in the order given by :func:`prioritize`: changed files
+first, then files near a changed path, then everything else.
+"""
+
+from __future__ import annotations
+
+import posixpath
+import time
+from typing import Callable, Iterable, List, Optional, Set
+
+
+class Budget:
+    """Deadline in ``seconds`` and/or a cap of ``max_files`` processed files.
+
+    Either limit may be ``None``. The clock starts when the budget is created.
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        max_files: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self.deadline = clock() + seconds if seconds is not None else None
+        self.max_files = max_files
+        self.files = 0
+
+    def charge(self, files: int = 1) -> None:
+        """Record ``files`` units of work."""
+        self.files += files
+
+    @property
+    def exhausted(self) -> bool:
+        if self.max_files is not None and self.files >= self.max_files:
+            return True
+        return self.deadline is not None and self._clock() >= self.deadline
+
+
+def _ancestors(directory: str) -> Set[str]:
+    found = set()
+    while directory:
+        found.add(directory)
+        directory = posixpath.dirname(directory)
+    return found
+
+
+def priority(path: str, changed: Set[str], changed_dirs: Set[str]) -> int:
+    """Return ``0`` for changed files, ``1`` for nearby files, ``2`` otherwise.
+
+    A file is nearby when it lives in the directory of a changed file or one
+    of that directory's ancestors, or in a direct subdirectory of those.
+    """
+    if path in changed:
+        return 0
+    directory = posixpath.dirname(path)
+    if directory in changed_dirs or posixpath.dirname(directory) in changed_dirs:
+        return 1
+    return 2
+
+
+def prioritize(paths: Iterable[str], changed: Iterable[str] = ()) -> List[str]:
+    """Sort repo-relative POSIX ``paths`` by :func:`priority`, keeping input order within a tier."""
+    changed = set(changed)
+    changed_dirs: Set[str] = set()
+    for path in changed:
+        changed_dirs |= _ancestors(posixpath.dirname(path))
+    if any("/" not in p for p in changed):
+        changed_dirs.add("")
+    return sorted(paths, key=lambda p: priority(p, changed, changed_dirs))
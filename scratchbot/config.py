@@ -5,6 +5,8 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, List
 
+from .file_scan import MAX_FILE_SIZE
+
 
 def _parse_value(value: str):
     value = value.strip()
@@ -53,6 +55,14 @@ class ScratchbotConfig:
         Optional lists of glob patterns controlling which paths are analysed.
     thresholds:
         Arbitrary integer thresholds such as line counts.
+    diff_exclude:
+        Extra glob patterns for generated, vendored or lock files whose diffs
+        are kept out of the planning prompt (on top of the built-in list).
+    diff_mode:
+        ``"summarize"`` to replace excluded diffs with a one-line summary or
+        ``"drop"`` to omit them entirely.
+    max_file_size:
+        Files larger than this many bytes are skipped instead of parsed.
     """
 
     commit_mode: str = "per_file"
@@ -60,6 +70,9 @@ class ScratchbotConfig:
     include: List[str] = field(default_factory=list)
     exclude: List[str] = field(default_factory=list)
     thresholds: Dict[str, int] = field(default_factory=dict)
+    diff_exclude: List[str] = field(default_factory=list)
+    diff_mode: str = "summarize"
+    max_file_size: int = MAX_FILE_SIZE
 
     @classmethod
     def from_file(cls, path: str | Path = ".scratchbot.yml") -> "ScratchbotConfig":
@@ -78,4 +91,7 @@ class ScratchbotConfig:
             include=data.get("include", []) or [],
             exclude=data.get("exclude", []) or [],
             thresholds=data.get("thresholds", {}) or {},
+            diff_exclude=data.get("diff_exclude", []) or [],
+            diff_mode=data.get("diff_mode", "summarize"),
+            max_file_size=data.get("max_file_size", MAX_FILE_SIZE),
         )
@@ -0,0 +1,330 @@
+"""Dependency metadata lookups for npm and PyPI packages.
+
+The analyzer only reports dependency names. :func:`fetch_dependency_metadata`
+resolves those names to a short summary (latest version, description,
+homepage, license) so plans can be grounded in what a dependency does.
+
+Results are kept in a :class:`MetadataCache` on disk that can be shared by
+concurrent jobs. Metadata documents are stored content-addressed under
+``objects/`` and each ``(ecosystem, name)`` key points at one through a small
+ref file under ``refs/``; writes are atomic renames so readers never observe
+partial files. Refs expire after a TTL and the least recently used entries are
+evicted once the objects exceed a size bound.
+
+Network access goes through a pluggable fetcher. :class:`RegistryFetcher`
+talks to the public registries (roots are configurable, which the tests use to
+point it at a local stand-in server) and :class:`MirrorFetcher` reads
+registry documents from a local directory for fully offline runs.
+
+Environment variables:
+
+``SCRATCHBOT_DEPS_CACHE``
+    Cache directory (defaults to ``~/.cache/scratchbot/deps``).
+``SCRATCHBOT_DEPS_MIRROR``
+    Mirror directory laid out as ``<ecosystem>/<name>.json`` (the ``/`` of a
+    scoped npm name is written ``%2F``, as in registry URLs).
+``SCRATCHBOT_OFFLINE``
+    When set to ``1``, never contact a registry; use the mirror and cache only.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+NPM_REGISTRY = "https://registry.npmjs.org"
+PYPI_REGISTRY = "https://pypi.org/pypi"
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+GC_GRACE_SECONDS = 60
+
+Metadata = Dict[str, Optional[str]]
+Fetcher = Callable[[str, str], Metadata]
+
+
+class MetadataError(RuntimeError):
+    """Raised when metadata for a dependency cannot be retrieved."""
+
+
+_PIP_NAME_RE = re.compile(r"[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?")
+_NPM_NAME_RE = re.compile(r"(?:@[A-Za-z0-9._~-]+/)?[A-Za-z0-9._~-]+")
+
+
+def normalize_name(ecosystem: str, name: str) -> Optional[str]:
+    """Return the bare package name in a dependency entry, or ``None``.
+
+    ``requirements.txt`` entries keep whatever follows the name apart from
+    ``<``/``>``/``=``, so extras, markers and operators such as ``~=`` or
+    ``!=`` are dropped here; option lines (``-r``, ``-e``), URLs and paths
+    are not registry packages and yield ``None``.
+    """
+    name = name.strip()
+    if ecosystem == "pip":
+        if name.startswith(("-", ".", "/")) or "://" in name:
+            return None
+        m = _PIP_NAME_RE.match(name)
+        return m.group(0) if m else None
+    if ecosystem == "npm":
+        return name if _NPM_NAME_RE.fullmatch(name) and name not in (".", "..") else None
+    return None
+
+
+def _canonical_name(ecosystem: str, name: str) -> str:
+    if ecosystem == "pip":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    return name
+
+
+def summarize(ecosystem: str, doc: Dict[str, object]) -> Metadata:
+    """Reduce a raw npm or PyPI registry document to the fields we use."""
+    if ecosystem == "npm":
+        latest = (doc.get("dist-tags") or {}).get("latest")
+        version_info = (doc.get("versions") or {}).get(latest, {}) if latest else {}
+        return {
+            "version": latest,
+            "description": version_info.get("description") or doc.get("description"),
+            "homepage": version_info.get("homepage") or doc.get("homepage"),
+            "license": version_info.get("license") or doc.get("license"),
+        }
+    if ecosystem == "pip":
+        info = doc.get("info") or {}
+        urls = info.get("project_urls") or {}
+        return {
+            "version": info.get("version"),
+            "description": info.get("summary"),
+            "homepage": info.get("home_page") or urls.get("Homepage"),
+            "license": info.get("license"),
+        }
+    raise MetadataError(f"unsupported ecosystem {ecosystem}")
+
+
+class RegistryFetcher:
+    """Fetch metadata from the npm and PyPI JSON APIs.
+
+    A single :class:`requests.Session` is shared by all lookups so concurrent
+    fetches reuse connections.
+    """
+
+    def __init__(
+        self,
+        npm_root: str = NPM_REGISTRY,
+        pypi_root: str = PYPI_REGISTRY,
+        timeout: float = 10,
+        session: Optional[requests.Session] = None,
+    ):
+        self.npm_root = npm_root.rstrip("/")
+        self.pypi_root = pypi_root.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def __call__(self, ecosystem: str, name: str) -> Metadata:
+        if ecosystem == "npm":
+            url = f"{self.npm_root}/{urllib.parse.quote(name, safe='@')}"
+        elif ecosystem == "pip":
+            url = f"{self.pypi_root}/{urllib.parse.quote(name, safe='')}/json"
+        else:
+            raise MetadataError(f"unsupported ecosystem {ecosystem}")
+        try:
+            resp = self.session.get(url, timeout=self.timeout)
+            resp.raise_for_status()
+            return summarize(ecosystem, resp.json())
+        except (requests.RequestException, ValueError) as exc:
+            raise MetadataError(f"failed to fetch {ecosystem}:{name}") from exc
+
+
+class MirrorFetcher:
+    """Read registry documents from ``<mirror_dir>/<ecosystem>/<name>.json``."""
+
+    def __init__(self, mirror_dir: str | Path):
+        self.mirror_dir = Path(mirror_dir)
+
+    def __call__(self, ecosystem: str, name: str) -> Metadata:
+        if ecosystem not in ("npm", "pip"):
+            raise MetadataError(f"unsupported ecosystem {ecosystem}")
+        filename = name.replace("/", "%2F") if ecosystem == "npm" and name.startswith("@") else name
+        if "/" in filename or "\\" in filename or filename in ("", ".", ".."):
+            raise MetadataError(f"invalid package name {name!r}")
+        path = self.mirror_dir / ecosystem / f"{filename}.json"
+        try:
+            doc = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise MetadataError(f"{ecosystem}:{name} not in mirror") from exc
+        return summarize(ecosystem, doc)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class MetadataCache:
+    """Content-addressed metadata cache shared across jobs.
+
+    ``ttl`` is the number of seconds a cached entry is considered fresh.
+    ``max_bytes`` bounds the total size of stored metadata documents.
+    """
+
+    def __init__(self, root: str | Path, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _ref_path(self, ecosystem: str, name: str) -> Path:
+        key = f"{ecosystem}:{_canonical_name(ecosystem, name)}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.root / "refs" / f"{digest}.json"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.json"
+
+    def get(self, ecosystem: str, name: str, allow_stale: bool = False) -> Optional[Metadata]:
+        """Return cached metadata, or ``None`` when missing or expired."""
+        ref_path = self._ref_path(ecosystem, name)
+        try:
+            ref = json.loads(ref_path.read_text(encoding="utf-8"))
+            data = json.loads(self._object_path(ref["digest"]).read_text(encoding="utf-8"))
+        except (OSError, ValueError, KeyError):
+            return None
+        if not allow_stale and time.time() - ref.get("fetched_at", 0) > self.ttl:
+            return None
+        try:
+            os.utime(ref_path)  # recency for LRU eviction
+        except OSError:
+            pass
+        return data
+
+    def put(self, ecosystem: str, name: str, metadata: Metadata) -> None:
+        """Store ``metadata``; call :meth:`prune` afterwards to enforce the bound."""
+        payload = json.dumps(metadata, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()
+        obj_path = self._object_path(digest)
+        if not obj_path.exists():
+            _atomic_write(obj_path, payload)
+        ref = {"key": f"{ecosystem}:{name}", "digest": digest, "fetched_at": time.time()}
+        _atomic_write(self._ref_path(ecosystem, name), json.dumps(ref).encode("utf-8"))
+
+    def prune(self) -> None:
+        """Evict least recently used refs until objects fit in ``max_bytes``."""
+        refs = []
+        for ref_path in (self.root / "refs").glob("*.json"):
+            try:
+                ref = json.loads(ref_path.read_text(encoding="utf-8"))
+                refs.append((ref_path.stat().st_mtime, ref_path, ref["digest"]))
+            except (OSError, ValueError, KeyError):
+                continue
+        objects = {p.stem: p for p in (self.root / "objects").glob("*/*.json")}
+        sizes = {}
+        for digest, path in objects.items():
+            try:
+                sizes[digest] = path.stat().st_size
+            except OSError:
+                pass
+        live = {}
+        for _, _, digest in refs:
+            live[digest] = live.get(digest, 0) + 1
+        total = sum(sizes.get(d, 0) for d in live)
+        for _, ref_path, digest in sorted(refs):
+            if total <= self.max_bytes:
+                break
+            ref_path.unlink(missing_ok=True)
+            live[digest] -= 1
+            if not live[digest]:
+                total -= sizes.get(digest, 0)
+        now = time.time()
+        for digest, path in objects.items():
+            if live.get(digest):
+                continue
+            try:
+                # another job may have written the object but not its ref yet
+                if now - path.stat().st_mtime < GC_GRACE_SECONDS:
+                    continue
+            except OSError:
+                continue
+            path.unlink(missing_ok=True)
+
+
+def default_cache() -> MetadataCache:
+    root = os.environ.get("SCRATCHBOT_DEPS_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "scratchbot", "deps"
+    )
+    return MetadataCache(root)
+
+
+def fetch_dependency_metadata(
+    dependencies: Dict[str, List[str]],
+    cache: Optional[MetadataCache] = None,
+    fetcher: Optional[Fetcher] = None,
+    offline: Optional[bool] = None,
+    mirror_dir: str | Path | None = None,
+    max_workers: int = 8,
+) -> Dict[str, Dict[str, Metadata]]:
+    """Resolve ``dependencies`` (as returned by ``analyze_repo``) to metadata.
+
+    Fresh cache entries are used directly; the rest are fetched concurrently
+    with ``fetcher`` (a :class:`RegistryFetcher` by default) and written back
+    to ``cache``. When ``offline`` is true the registry is never contacted and
+    only the mirror in ``mirror_dir`` is consulted. If a lookup fails, a stale
+    cached entry is used when available; otherwise the dependency is omitted.
+    Entries are reduced to bare names first (see :func:`normalize_name`);
+    entries that are not registry packages are omitted.
+    """
+    if cache is None:
+        cache = default_cache()
+    if offline is None:
+        offline = os.environ.get("SCRATCHBOT_OFFLINE") == "1"
+    if mirror_dir is None:
+        mirror_dir = os.environ.get("SCRATCHBOT_DEPS_MIRROR")
+    if offline:
+        fetcher = MirrorFetcher(mirror_dir) if mirror_dir else None
+    elif fetcher is None:
+        fetcher = RegistryFetcher()
+
+    result: Dict[str, Dict[str, Metadata]] = {}
+    pending = []
+    for ecosystem, names in dependencies.items():
+        result[ecosystem] = {}
+        normalized = (normalize_name(ecosystem, name) for name in names)
+        for name in dict.fromkeys(n for n in normalized if n):
+            cached = cache.get(ecosystem, name)
+            if cached is not None:
+                result[ecosystem][name] = cached
+            else:
+                pending.append((ecosystem, name))
+
+    def lookup(item):
+        ecosystem, name = item
+        if fetcher is not None:
+            try:
+                metadata = fetcher(ecosystem, name)
+            except MetadataError:
+                pass
+            else:
+                cache.put(ecosystem, name, metadata)
+                return metadata
+        return cache.get(ecosystem, name, allow_stale=True)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for (ecosystem, name), metadata in zip(pending, pool.map(lookup, pending)):
+                if metadata is not None:
+                    result[ecosystem][name] = metadata
+        cache.prune()
+    return result
@@ -0,0 +1,265 @@
+"""Lightweight import graph used to pick relevant planning context.
+
+Python edges come from ``import`` statements collected during the same
+``ast`` pass that extracts symbols (see :func:`python_imports`); JS/TS edges
+come from relative ``import``/``export ... from``/``require()`` specifiers
+matched with a regular expression. :meth:`ImportGraph.related` walks the
+graph in both directions (importers and importees) from the changed files.
+
+Per-file JS specifiers and whole graphs are cached in memory, keyed on file
+modification times, so repeated planning runs on the same checkout only
+re-read files that changed.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import os
+import posixpath
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .analyze import SKIP_DIRS
+from .budget import Budget, prioritize
+from .file_scan import MAX_FILE_SIZE, scan_file
+
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+CACHE_SIZE = 50_000
+GRAPH_CACHE_SIZE = 8
+
+_JS_SPEC_RE = re.compile(
+    r"""(?:\bimport|\bexport)\s[^'";]*?\bfrom\s*['"]([^'"]+)['"]"""
+    r"""|\bimport\s*\(?\s*['"]([^'"]+)['"]"""
+    r"""|\brequire\s*\(\s*['"]([^'"]+)['"]\s*\)"""
+)
+
+_js_cache: "OrderedDict[Tuple[str, int, int], List[str]]" = OrderedDict()
+_graph_cache: "OrderedDict[Tuple[str, str], ImportGraph]" = OrderedDict()
+# planning jobs run concurrently in one process (worker pools, load tests)
+_cache_lock = threading.Lock()
+
+
+def _cache_get(cache: OrderedDict, key):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache: OrderedDict, key, value, limit: int) -> None:
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+
+def _package_of(relpath: str) -> List[str]:
+    parts = relpath[:-3].split("/")
+    return parts[:-1]
+
+
+def python_imports(tree: ast.AST, relpath: str) -> List[str]:
+    """Return absolute dotted module candidates imported by ``tree``.
+
+    ``from pkg import name`` yields both ``pkg.name`` and ``pkg`` since
+    ``name`` may be a submodule or an attribute; resolution later keeps
+    whichever exists. Relative imports are made absolute using ``relpath``.
+    """
+    found: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                package = _package_of(relpath)
+                if node.level > 1:
+                    package = package[: len(package) - (node.level - 1)]
+                base = ".".join(package + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            for alias in node.names:
+                if alias.name != "*":
+                    found.append(f"{base}.{alias.name}" if base else alias.name)
+            if base:
+                found.append(base)
+    return list(dict.fromkeys(found))
+
+
+def js_imports(source: str) -> List[str]:
+    """Return the module specifiers imported or required by JS/TS ``source``."""
+    return [next(g for g in m.groups() if g) for m in _JS_SPEC_RE.finditer(source)]
+
+
+def _module_names(relpath: str, roots: Set[str]) -> List[str]:
+    parts = relpath[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    names = [".".join(parts)] if parts else []
+    # src-layout and script directories: the first component is a path entry
+    # rather than a package when it has no ``__init__.py``.
+    if len(parts) > 1 and parts[0] not in roots:
+        names.append(".".join(parts[1:]))
+    return names
+
+
+class ImportGraph:
+    """Directed graph of repo-relative file paths (``importer -> importee``)."""
+
+    def __init__(self) -> None:
+        self.imports: Dict[str, Set[str]] = {}
+        self.importers: Dict[str, Set[str]] = {}
+        # JS/TS files left unread when the budget ran out
+        self.pending: List[str] = []
+
+    def add_node(self, path: str) -> None:
+        self.imports.setdefault(path, set())
+        self.importers.setdefault(path, set())
+
+    def add_edge(self, importer: str, importee: str) -> None:
+        if importer == importee:
+            return
+        self.add_node(importer)
+        self.add_node(importee)
+        self.imports[importer].add(importee)
+        self.importers[importee].add(importer)
+
+    def related(self, paths: Iterable[str], hops: int) -> Set[str]:
+        """Return ``paths`` plus every file within ``hops`` edges of them."""
+        seen = set(paths)
+        frontier = set(seen)
+        for _ in range(hops):
+            nxt: Set[str] = set()
+            for path in frontier:
+                nxt.update(self.imports.get(path, ()))
+                nxt.update(self.importers.get(path, ()))
+            frontier = nxt - seen
+            if not frontier:
+                break
+            seen.update(frontier)
+        return seen
+
+
+def _walk_js(repo: Path) -> List[str]:
+    found = []
+    for dirpath, dirnames, filenames in os.walk(repo):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+        for filename in filenames:
+            if filename.endswith(JS_EXTENSIONS) and not filename.endswith(".d.ts"):
+                found.append(os.path.join(dirpath, filename))
+    return found
+
+
+def _js_specs(path: str, max_file_size: Optional[int]) -> Tuple[Tuple[int, int], List[str]]:
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    specs = _cache_get(_js_cache, key)
+    if specs is None:
+        specs = []
+        if not scan_file(path, max_file_size).skipped:
+            with open(path, "rb") as f:
+                specs = js_imports(f.read().decode("utf-8", errors="replace"))
+        _cache_put(_js_cache, key, specs, CACHE_SIZE)
+    return (st.st_mtime_ns, st.st_size), specs
+
+
+def _resolve_js(importer: str, spec: str, files: Set[str]) -> Optional[str]:
+    if not spec.startswith("."):
+        return None
+    base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), spec))
+    candidates = [base]
+    candidates += [base + ext for ext in JS_EXTENSIONS]
+    candidates += [f"{base}/index{ext}" for ext in JS_EXTENSIONS]
+    # TS sources commonly import "./mod.js" while the file is "mod.ts"
+    stem, ext = posixpath.splitext(base)
+    if ext in JS_EXTENSIONS:
+        candidates += [stem + e for e in JS_EXTENSIONS]
+    for cand in candidates:
+        if cand in files:
+            return cand
+    return None
+
+
+def build_import_graph(
+    repo: str | Path,
+    python: Dict[str, List[str]],
+    max_file_size: Optional[int] = MAX_FILE_SIZE,
+    deleted: Iterable[str] = (),
+    budget: Optional[Budget] = None,
+    changed: Iterable[str] = (),
+) -> ImportGraph:
+    """Build the import graph for ``repo``.
+
+    ``python`` maps repo-relative ``.py`` paths to the module candidates
+    returned by :func:`python_imports`. JS/TS files are discovered and read
+    here. ``deleted`` lists repo-relative paths removed from the tree; they
+    stay resolvable as import targets so their former importers remain
+    connected to them. Graphs are cached per repository until any input
+    changes.
+
+    With a ``budget``, each JS/TS file read is charged to it (``changed``
+    files first); files left once it is spent are listed in
+    :attr:`ImportGraph.pending` and only kept as import targets.
+    """
+    repo = Path(repo)
+    deleted = sorted(set(deleted))
+    js_specs: Dict[str, List[str]] = {}
+    digest = hashlib.sha256()
+    digest.update(f"deleted:{','.join(deleted)}\n".encode("utf-8"))
+    for rel in sorted(python):
+        digest.update(f"{rel}:{','.join(python[rel])}\n".encode("utf-8"))
+    js_paths = {Path(path).relative_to(repo).as_posix(): path for path in _walk_js(repo)}
+    order = prioritize(sorted(js_paths), changed) if budget is not None else sorted(js_paths)
+    stamps: Dict[str, Tuple[int, int]] = {}
+    pending: List[str] = []
+    for rel in order:
+        if budget is not None:
+            if budget.exhausted:
+                pending.append(rel)
+                continue
+            budget.charge()
+        stamps[rel], js_specs[rel] = _js_specs(js_paths[rel], max_file_size)
+    for rel in sorted(stamps):
+        digest.update(f"{rel}:{stamps[rel]}\n".encode("utf-8"))
+    digest.update(f"pending:{','.join(sorted(pending))}\n".encode("utf-8"))
+    key = (str(repo.resolve()), digest.hexdigest())
+    graph = _cache_get(_graph_cache, key)
+    if graph is not None:
+        return graph
+
+    graph = ImportGraph()
+    roots = {rel.split("/")[0] for rel in python if rel.count("/") and rel.split("/")[1] == "__init__.py"}
+    modules: Dict[str, str] = {}
+    for rel in python:
+        graph.add_node(rel)
+        for name in _module_names(rel, roots):
+            modules.setdefault(name, rel)
+    for rel in deleted:
+        if rel.endswith(".py"):
+            graph.add_node(rel)
+            for name in _module_names(rel, roots):
+                modules.setdefault(name, rel)
+    for rel, candidates in python.items():
+        for name in candidates:
+            while name:
+                if name in modules:
+                    graph.add_edge(rel, modules[name])
+                    break
+                name = name.rpartition(".")[0]
+
+    js_files = set(js_specs) | set(pending) | {rel for rel in deleted if rel.endswith(JS_EXTENSIONS)}
+    graph.pending = sorted(pending)
+    for rel, specs in js_specs.items():
+        graph.add_node(rel)
+        for spec in specs:
+            target = _resolve_js(rel, spec, js_files)
+            if target:
+                graph.add_edge(rel, target)
+
+    _cache_put(_graph_cache, key, graph, GRAPH_CACHE_SIZE)
+    return graph
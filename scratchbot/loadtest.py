@@ -0,0 +1,444 @@
+"""Load-test harness for the PR documentation pipeline.
+
+Runs the full per-PR path::
+
+    clone_pr_branch -> analyze_repo -> assemble_context -> generate_docs_plan
+        -> upsert_comment / set_plan_status -> commit_changes
+
+against local stand-ins only: a bare git repository reached through a
+``file://`` remote, a fake GitHub REST server (wired in by overriding
+:data:`scratchbot.github_api.API_ROOT`) and a fake model transport with
+configurable latency behind the shared :class:`~scratchbot.plan_prompt.ModelClient`.
+
+PRs are driven concurrently from a thread pool, mirroring a worker that runs
+several jobs at once. The report contains throughput, p50/p95/p99 latency per
+stage and end to end, and CPU/RSS usage of the process and its ``git``
+children::
+
+    python -m scratchbot.loadtest --prs 40 --concurrency 8 --model-latency 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from . import github_api
+from .analyze import analyze_repo
+from .git_ops import clone_pr_branch, commit_changes
+from .plan_builder import assemble_context
+from .plan_prompt import ModelClient, generate_docs_plan
+
+STAGES = ["clone", "analyze", "context", "plan", "github", "commit"]
+REPO = "scratchbot/loadtest"
+PLAN_HEADER = "## \U0001f4da Docs Plan"
+
+_GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "ScratchBot",
+    "GIT_AUTHOR_EMAIL": "scratchbot@example.com",
+    "GIT_COMMITTER_NAME": "ScratchBot",
+    "GIT_COMMITTER_EMAIL": "scratchbot@example.com",
+}
+
+
+class FakeGitHub:
+    """In-memory stand-in for the GitHub endpoints used by ``github_api``."""
+
+    _COMMENTS = re.compile(r"^/repos/([^/]+/[^/]+)/issues/(\d+)/comments$")
+    _COMMENT = re.compile(r"^/repos/([^/]+/[^/]+)/issues/comments/(\d+)$")
+    _STATUS = re.compile(r"^/repos/([^/]+/[^/]+)/statuses/([0-9a-f]+)$")
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.comments: Dict[int, Dict[str, object]] = {}
+        self.statuses: List[Dict[str, object]] = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code: int, payload: object = None) -> None:
+                body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> Dict[str, object]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _handle(self, method: str) -> None:
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                path = self.path.split("?")[0]
+                m = fake._COMMENTS.match(path)
+                if m and method in ("GET", "POST"):
+                    issue = int(m.group(2))
+                    with fake._lock:
+                        if method == "GET":
+                            found = [c for c in fake.comments.values() if c["issue"] == issue and c["repo"] == m.group(1)]
+                            return self._reply(200, found)
+                        cid = len(fake.comments) + 1
+                        comment = {
+                            "id": cid,
+                            "repo": m.group(1),
+                            "issue": issue,
+                            "body": self._body()["body"],
+                            "url": f"{fake.url}/repos/{m.group(1)}/issues/comments/{cid}",
+                        }
+                        fake.comments[cid] = comment
+                    return self._reply(201, comment)
+                m = fake._COMMENT.match(path)
+                if m and method == "PATCH":
+                    with fake._lock:
+                        comment = fake.comments.get(int(m.group(2)))
+                        if comment is None:
+                            return self._reply(404, {"message": "Not Found"})
+                        comment["body"] = self._body()["body"]
+                    return self._reply(200, comment)
+                m = fake._STATUS.match(path)
+                if m and method == "POST":
+                    status = dict(self._body(), repo=m.group(1), sha=m.group(2))
+                    with fake._lock:
+                        fake.statuses.append(status)
+                    return self._reply(201, status)
+                return self._reply(404, {"message": "Not Found"})
+
+            def do_GET(self) -> None:
+                self._handle("GET")
+
+            def do_POST(self) -> None:
+                self._handle("POST")
+
+            def do_PATCH(self) -> None:
+                self._handle("PATCH")
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "FakeGitHub":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeModel:
+    """Model transport that sleeps ``latency`` (+/- ``jitter``) seconds.
+
+    The plan it returns asks for a doc page named after the first file in
+    the prompt's diff so every PR commits something.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, model: str, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        m = re.search(r"^diff --git a/\S+ b/(\S+)", prompt, re.MULTILINE)
+        name = Path(m.group(1)).stem if m else "overview"
+        return json.dumps({"missing": [f"docs/{name}.md"], "needs_update": []})
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def make_origin(workdir: Path, prs: int, modules: int = 20) -> Path:
+    """Create a bare repo with ``main`` and one ``pr-<n>`` branch per PR."""
+    origin = workdir / "origin.git"
+    seed = workdir / "seed"
+    _git(workdir, "init", "--bare", "-b", "main", str(origin))
+    _git(workdir, "init", "-b", "main", str(seed))
+    pkg = seed / "app"
+    pkg.mkdir()
+    (seed / "README.md").write_text("# Load test fixture\n", encoding="utf-8")
+    (pkg / "__init__.py").write_text("", encoding="utf-8")
+    for i in range(modules):
+        imports = f"from .mod{i - 1} import func{i - 1}\n\n" if i else ""
+        body = "".join(f"def func{i}_{j}(a, b):\n    return a + b\n\n" for j in range(10))
+        (pkg / f"mod{i}.py").write_text(f"{imports}def func{i}(x):\n    return x\n\n{body}", encoding="utf-8")
+    _git(seed, "add", ".")
+    _git(seed, "commit", "-m", "base")
+    _git(seed, "push", str(origin), "main")
+    for n in range(prs):
+        _git(seed, "checkout", "-q", "-b", f"pr-{n}", "main")
+        (pkg / f"feature{n}.py").write_text(
+            f"from .mod{n % modules} import func{n % modules}\n\n\ndef feature{n}(x):\n    return func{n % modules}(x)\n",
+            encoding="utf-8",
+        )
+        _git(seed, "add", ".")
+        _git(seed, "commit", "-m", f"feature {n}")
+    _git(seed, "checkout", "-q", "main")
+    _git(seed, "push", str(origin), *[f"pr-{n}" for n in range(prs)])
+    return origin
+
+
+@dataclass
+class PRResult:
+    number: int
+    stages: Dict[str, float] = field(default_factory=dict)
+    total: float = 0.0
+    error: Optional[str] = None
+
+
+@contextmanager
+def _redirect_fds(stdout: int, stderr: Optional[int] = None) -> Iterator[None]:
+    """Point fd 1 (and fd 2 when ``stderr`` is given) at other descriptors.
+
+    This affects the whole process; ``git`` subprocesses inherit the fds.
+    """
+    targets = {1: stdout} if stderr is None else {1: stdout, 2: stderr}
+    saved = {fd: os.dup(fd) for fd in targets}
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, target in targets.items():
+            os.dup2(target, fd)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, copy in saved.items():
+            os.dup2(copy, fd)
+            os.close(copy)
+
+
+@contextmanager
+def _quiet_fds() -> Iterator[None]:
+    """Send stdout/stderr (including ``git`` subprocesses) to ``/dev/null``."""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        with _redirect_fds(devnull, devnull):
+            yield
+    finally:
+        os.close(devnull)
+
+
+@contextmanager
+def _timed(result: PRResult, stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        result.stages[stage] = time.perf_counter() - start
+
+
+def run_pr(number: int, origin: Path, workdir: Path, client: ModelClient, token: str = "test-token") -> PRResult:
+    """Run the pipeline for PR ``number`` and record per-stage durations."""
+    result = PRResult(number)
+    dest = workdir / f"pr-{number}"
+    start = time.perf_counter()
+    try:
+        with _timed(result, "clone"):
+            clone_pr_branch(f"file://{origin}", f"pr-{number}", dest)
+            sha = _git(dest, "rev-parse", "HEAD")
+        with _timed(result, "analyze"):
+            analyze_repo(str(dest))
+        with _timed(result, "context"):
+            context = assemble_context(dest, base_ref="origin/main")
+        with _timed(result, "plan"):
+            plan = generate_docs_plan(context, client.complete)
+        with _timed(result, "github"):
+            body = PLAN_HEADER + "\n" + "\n".join(f"- [ ] {p}" for p in plan["missing"])
+            github_api.upsert_comment(REPO, number, body, token)
+            github_api.set_plan_status(REPO, sha, "success", token, description="plan ready")
+        with _timed(result, "commit"):
+            for path in plan["missing"]:
+                doc = dest / path
+                doc.parent.mkdir(parents=True, exist_ok=True)
+                doc.write_text(f"# {doc.stem}\n", encoding="utf-8")
+            commit_changes(dest, plan["missing"], "docs: add {path} (ScratchBot)", mode="batch")
+    except Exception as exc:  # report failures instead of aborting the run
+        result.error = f"{type(exc).__name__}: {exc}"
+    result.total = time.perf_counter() - start
+    return result
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``0.0`` when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _latency_stats(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def run_load_test(
+    prs: int = 20,
+    concurrency: int = 4,
+    model_latency: float = 0.0,
+    model_jitter: float = 0.0,
+    github_latency: float = 0.0,
+    modules: int = 20,
+    requests_per_minute: Optional[float] = None,
+    workdir: Optional[str | Path] = None,
+    quiet: bool = False,
+) -> Dict[str, object]:
+    """Drive ``prs`` PRs through the pipeline with ``concurrency`` workers.
+
+    While the run lasts, a placeholder git identity is put in ``os.environ``
+    for any ``GIT_AUTHOR_*``/``GIT_COMMITTER_*`` variable that is unset, so
+    ``commit_changes`` works on fresh hosts. Fixture setup is excluded from
+    the measurements. With ``quiet`` the process's stdout and stderr,
+    including the output of ``git`` subprocesses, are discarded during the
+    run. Returns the report as a dict (see :func:`format_report`).
+    """
+    tmp = None
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="scratchbot-load-")
+        workdir = tmp.name
+    workdir = Path(workdir)
+    original_root = github_api.API_ROOT
+    identity = {key: value for key, value in _GIT_IDENTITY.items() if key not in os.environ}
+    os.environ.update(identity)
+    try:
+        origin = make_origin(workdir, prs, modules)
+        model = FakeModel(model_latency, model_jitter)
+        client = ModelClient(model, model="fake", requests_per_minute=requests_per_minute)
+        with FakeGitHub(github_latency) as fake:
+            github_api.API_ROOT = fake.url
+            self_before = resource.getrusage(resource.RUSAGE_SELF)
+            child_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            start = time.perf_counter()
+            with _quiet_fds() if quiet else nullcontext():
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    results = list(pool.map(lambda n: run_pr(n, origin, workdir, client), range(prs)))
+            elapsed = time.perf_counter() - start
+            self_after = resource.getrusage(resource.RUSAGE_SELF)
+            child_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            github_requests = fake.requests
+    finally:
+        github_api.API_ROOT = original_root
+        for key in identity:
+            os.environ.pop(key, None)
+        if tmp is not None:
+            tmp.cleanup()
+
+    ok = [r for r in results if r.error is None]
+    return {
+        "prs": prs,
+        "concurrency": concurrency,
+        "succeeded": len(ok),
+        "failed": [{"pr": r.number, "error": r.error} for r in results if r.error],
+        "elapsed_seconds": elapsed,
+        "throughput_per_minute": len(ok) / elapsed * 60 if elapsed else 0.0,
+        "latency": {
+            **{stage: _latency_stats([r.stages[stage] for r in ok]) for stage in STAGES},
+            "total": _latency_stats([r.total for r in ok]),
+        },
+        "resources": {
+            "cpu_user_seconds": self_after.ru_utime - self_before.ru_utime,
+            "cpu_system_seconds": self_after.ru_stime - self_before.ru_stime,
+            "child_cpu_seconds": (child_after.ru_utime - child_before.ru_utime)
+            + (child_after.ru_stime - child_before.ru_stime),
+            "max_rss_kb": self_after.ru_maxrss,
+        },
+        "model_calls": model.calls,
+        "github_requests": github_requests,
+    }
+
+
+def format_report(report: Dict[str, object]) -> str:
+    """Render ``report`` as a plain-text table."""
+    lines = [
+        f"PRs: {report['succeeded']}/{report['prs']} succeeded"
+        f" (concurrency {report['concurrency']}) in {report['elapsed_seconds']:.2f}s",
+        f"Throughput: {report['throughput_per_minute']:.1f} PRs/min",
+        "",
+        f"{'stage':<10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+    ]
+    for stage, stats in report["latency"].items():
+        lines.append(
+            f"{stage:<10}" + "".join(f"{stats[k] * 1000:>8.1f}ms" for k in ("p50", "p95", "p99", "max"))
+        )
+    res = report["resources"]
+    lines += [
+        "",
+        f"CPU: {res['cpu_user_seconds']:.2f}s user, {res['cpu_system_seconds']:.2f}s system,"
+        f" {res['child_cpu_seconds']:.2f}s in git subprocesses",
+        f"Max RSS: {res['max_rss_kb'] / 1024:.1f} MiB",
+        f"Model calls: {report['model_calls']}, GitHub requests: {report['github_requests']}",
+    ]
+    for failure in report["failed"]:
+        lines.append(f"FAILED pr-{failure['pr']}: {failure['error']}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the ScratchBot PR pipeline against local stand-ins")
+    parser.add_argument("--prs", type=int, default=20, help="Number of PRs to process")
+    parser.add_argument("--concurrency", type=int, default=4, help="PRs processed at once")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Fake model latency in seconds")
+    parser.add_argument("--model-jitter", type=float, default=0.0, help="Random +/- jitter on model latency")
+    parser.add_argument("--github-latency", type=float, default=0.0, help="Fake GitHub latency per request")
+    parser.add_argument("--modules", type=int, default=20, help="Python modules in the fixture repo")
+    parser.add_argument("--rpm", type=float, default=None, help="Model requests per minute limit")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Discard all output (including git) during the run")
+    args = parser.parse_args()
+    # keep git's stdout chatter out of the JSON report; stderr stays visible
+    with _redirect_fds(2) if args.json and not args.quiet else nullcontext():
+        report = run_load_test(
+            prs=args.prs,
+            concurrency=args.concurrency,
+            model_latency=args.model_latency,
+            model_jitter=args.model_jitter,
+            github_latency=args.github_latency,
+            modules=args.modules,
+            requests_per_minute=args.rpm,
+            quiet=args.quiet,
+        )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,78 @@
 This module provides utilities to collect a git diff, file tree, and
 symbol summaries for a repository.  The result is bounded by a token
 limit (approximate using whitespace separated words).
+
+The diff is read from ``git`` as a stream and parsed into per-file
+:class:`FileDiff` records. Lock files, generated bundles and vendored code
+are summarized (or dropped) instead of being pasted into the prompt, and
+each file keeps at most ``MAX_FILE_DIFF_LINES`` hunk lines. Besides the
+``diff_exclude`` patterns, newly added files that open with a
+generated-code header or a minified-length line (outside prose files) are
+treated the same way.
+
+Symbol summaries are limited to files within ``RELEVANCE_HOPS`` import
+edges of the changed files (see :mod:`scratchbot.import_graph`), together
+with the README/index docs of their directories.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
 from pathlib import Path
 import ast
+import io
+import os
+import posixpath
+import re
 import subprocess
-from typing import Dict, List
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .budget import Budget, prioritize
+from .config import ScratchbotConfig
+from .file_scan import (
+    GENERATED_HEADER_RE,
+    GENERATED_SUFFIXES,
+    MAX_FILE_SIZE,
+    MINIFIED_LINE_LENGTH,
+    scan_file,
+)
+from .import_graph import build_import_graph, python_imports
 
 TOKEN_LIMIT = 150_000
+MAX_FILE_DIFF_LINES = 2_000
+RELEVANCE_HOPS = 2
+GENERATED_HEADER_LINES = 20
+PROSE_SUFFIXES = (".md", ".markdown", ".rst", ".txt", ".adoc")
+SUMMARY_CACHE_SIZE = 50_000
+
+DEFAULT_DIFF_EXCLUDE = [
+    "package-lock.json",
+    "pnpm-lock.yaml",
+    "yarn.lock",
+    "poetry.lock",
+    "Pipfile.lock",
+    "Cargo.lock",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.snap",
+    "vendor/*",
+    "third_party/*",
+    "node_modules/*",
+    "dist/*",
+    "build/*",
+]
+
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+_GENERATED_HEADER_RE = re.compile(GENERATED_HEADER_RE.pattern.decode("ascii"), re.MULTILINE)
+_C_ESCAPES = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13, '"': 34, "\\": 92}
+
+_summary_cache: "OrderedDict[Tuple[str, str, int, int, Optional[int]], Optional[FileSummary]]" = OrderedDict()
+_summary_lock = threading.Lock()
 
 
 @dataclass
@@ -21,62 +82,415 @@ class FileSummary:
     path: str
     symbols: List[str]
     loc: int
+    imports: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FileDiff:
+    """Parsed diff for a single file.
+
+    ``status`` is one of ``added``, ``deleted``, ``renamed``, ``copied`` or
+    ``modified``; ``old_path`` is set for renames and copies. ``hunks`` holds
+    the raw hunk text and is left empty for excluded (summarized) files.
+    """
+
+    path: str
+    status: str = "modified"
+    old_path: Optional[str] = None
+    hunks: List[str] = field(default_factory=list)
+    added: int = 0
+    removed: int = 0
+    binary: bool = False
+    excluded: bool = False
+    truncated: bool = False
+
+
+def is_excluded_path(path: str, patterns: Iterable[str]) -> bool:
+    """Return ``True`` if ``path`` matches a pattern at any directory depth."""
+    return any(fnmatch(path, pat) or fnmatch(path, "*/" + pat) for pat in patterns)
+
+
+def unquote_path(path: str) -> str:
+    """Undo git's C-style quoting of a path (``"caf\\303\\251.py"``)."""
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+    out = bytearray()
+    inner = path[1:-1]
+    i = 0
+    while i < len(inner):
+        ch = inner[i]
+        if ch == "\\" and i + 1 < len(inner):
+            nxt = inner[i + 1]
+            if nxt in "01234567":
+                out.append(int(inner[i + 1:i + 4], 8) & 0xFF)
+                i += 4
+                continue
+            out.append(_C_ESCAPES.get(nxt, ord(nxt)))
+            i += 2
+            continue
+        out.extend(ch.encode("utf-8"))
+        i += 1
+    return out.decode("utf-8", errors="replace")
+
+
+def _strip_prefix(path: str, prefix: str) -> str:
+    path = unquote_path(path)
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+def _diff_git_paths(line: str) -> tuple[str, str]:
+    rest = line[len("diff --git "):]
+    if rest.startswith('"'):
+        end = 1
+        while end < len(rest) and rest[end] != '"':
+            end += 2 if rest[end] == "\\" else 1
+        old, new = rest[:end + 1], rest[end + 2:]
+    else:
+        quoted = rest.find(' "b/')
+        if quoted != -1 and rest.endswith('"'):
+            old, new = rest[:quoted], rest[quoted + 1:]
+        else:
+            old, sep, new = rest.partition(" b/")
+            if not sep:
+                return rest, rest
+            new = "b/" + new
+    return _strip_prefix(old, "a/"), _strip_prefix(new, "b/")
+
+
+def _looks_generated(diff: FileDiff, line: str, stored: int) -> bool:
+    """Check the first added lines of a new file for a generated header or minified code."""
+    if diff.status != "added" or stored >= GENERATED_HEADER_LINES or not line.startswith("+"):
+        return False
+    if _GENERATED_HEADER_RE.match(line[1:]):
+        return True
+    # long lines are normal in prose (one paragraph per line)
+    return len(line) > MINIFIED_LINE_LENGTH and not diff.path.endswith(PROSE_SUFFIXES)
+
+
+def parse_unified_diff(
+    lines: Iterable[str],
+    exclude: Iterable[str] = DEFAULT_DIFF_EXCLUDE,
+    max_lines: int = MAX_FILE_DIFF_LINES,
+) -> Iterator[FileDiff]:
+    """Yield a :class:`FileDiff` per file from ``git diff`` output ``lines``.
+
+    ``lines`` is consumed lazily so only the current file is held in memory.
+    Hunks of files matching ``exclude`` are counted but not stored, and a
+    new file is excluded when its first added lines show it is generated or
+    minified.
+    """
+    exclude = list(exclude)
+    current: Optional[FileDiff] = None
+    hunk: List[str] = []
+    stored = 0
+    old_left = new_left = 0
+
+    def finish() -> Optional[FileDiff]:
+        if current is not None and hunk:
+            current.hunks.append("\n".join(hunk))
+        return current
+
+    def store(line: str) -> None:
+        nonlocal stored
+        if current.excluded:
+            return
+        if _looks_generated(current, line, stored):
+            current.excluded = True
+            current.truncated = False
+            current.hunks.clear()
+            hunk.clear()
+        elif stored < max_lines:
+            hunk.append(line)
+            stored += 1
+        else:
+            current.truncated = True
+
+    def is_excluded(path: str) -> bool:
+        return path.endswith(GENERATED_SUFFIXES) or is_excluded_path(path, exclude)
+
+    for raw in lines:
+        line = raw.rstrip("\n")
+        if old_left > 0 or new_left > 0:
+            tag = line[:1]
+            if tag == "+":
+                new_left -= 1
+                current.added += 1
+            elif tag == "-":
+                old_left -= 1
+                current.removed += 1
+            elif tag == "\\":
+                pass
+            else:
+                old_left -= 1
+                new_left -= 1
+            store(line)
+            continue
+
+        if line.startswith("diff --git "):
+            done = finish()
+            if done is not None:
+                yield done
+            old_path, new_path = _diff_git_paths(line)
+            current = FileDiff(path=new_path, old_path=old_path if old_path != new_path else None)
+            current.excluded = is_excluded(new_path)
+            hunk = []
+            stored = 0
+            continue
+        if current is None:
+            continue
+        match = _HUNK_RE.match(line)
+        if match:
+            if hunk:
+                current.hunks.append("\n".join(hunk))
+                hunk = []
+            old_left = int(match.group(1) if match.group(1) is not None else 1)
+            new_left = int(match.group(2) if match.group(2) is not None else 1)
+            store(line)
+        elif line.startswith("new file mode"):
+            current.status = "added"
+        elif line.startswith("deleted file mode"):
+            current.status = "deleted"
+        elif line.startswith(("rename from ", "copy from ")):
+            current.status = "renamed" if line.startswith("rename") else "copied"
+            current.old_path = unquote_path(line.split(" ", 2)[2])
+        elif line.startswith(("rename to ", "copy to ")):
+            current.path = unquote_path(line.split(" ", 2)[2])
+            current.excluded = current.excluded or is_excluded(current.path)
+        elif line.startswith("Binary files ") or line == "GIT binary patch":
+            current.binary = True
+
+    done = finish()
+    if done is not None:
+        yield done
+
+
+def iter_git_diff(
+    repo: str | Path,
+    base_ref: str = "origin/main",
+    exclude: Iterable[str] = DEFAULT_DIFF_EXCLUDE,
+) -> Iterator[FileDiff]:
+    """Stream ``git diff base_ref...HEAD`` for ``repo`` as :class:`FileDiff` records."""
+    proc = subprocess.Popen(
+        ["git", "-C", str(repo), "-c", "core.quotePath=false", "diff", "--no-color", "--no-ext-diff",
+         f"{base_ref}...HEAD"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        stream = io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="replace")
+        yield from parse_unified_diff(stream, exclude)
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        returncode = proc.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, proc.args, stderr=stderr)
+
+
+def render_diff(files: Iterable[FileDiff], mode: str = "summarize") -> str:
+    """Render parsed diffs back to text for the prompt.
+
+    Excluded and binary files become a one-line summary, or are omitted when
+    ``mode`` is ``"drop"``.
+    """
+    out: List[str] = []
+    for f in files:
+        if f.excluded or f.binary:
+            if mode == "drop":
+                continue
+            kind = "binary file" if f.binary else "generated/vendored file"
+            out.append(f"# {f.path}: {f.status} {kind}, +{f.added} -{f.removed} (diff omitted)")
+            continue
+        old_path = f.old_path or f.path
+        out.append(f"diff --git a/{old_path} b/{f.path}")
+        if f.status in ("renamed", "copied"):
+            verb = "rename" if f.status == "renamed" else "copy"
+            out.append(f"{verb} from {old_path}")
+            out.append(f"{verb} to {f.path}")
+        if f.hunks:
+            out.append("--- /dev/null" if f.status == "added" else f"--- a/{old_path}")
+            out.append("+++ /dev/null" if f.status == "deleted" else f"+++ b/{f.path}")
+        out.extend(f.hunks)
+        if f.truncated:
+            out.append(f"# {f.path}: diff truncated after {MAX_FILE_DIFF_LINES} lines")
+    return "\n".join(out)
 
 
 def _token_count(text: str) -> int:
     return len(text.split())
 
 
-def _python_symbols(path: Path) -> List[str]:
-    tree = ast.parse(path.read_text(encoding="utf-8"))
+def _python_symbols(path: Path, rel: str) -> Tuple[List[str], List[str]]:
+    """Return public top-level symbols and imported modules of ``path``."""
+    try:
+        tree = ast.parse(path.read_bytes())
+    except (SyntaxError, ValueError):
+        return [], []
     symbols: List[str] = []
     for node in tree.body:
         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
             if not node.name.startswith("_"):
                 symbols.append(node.name)
-    return symbols
+    return symbols, python_imports(tree, rel)
+
+
+def _summarize_file(file: Path, rel: str, max_file_size: int | None) -> Optional[FileSummary]:
+    st = file.stat()
+    key = (str(file), rel, st.st_mtime_ns, st.st_size, max_file_size)
+    with _summary_lock:
+        if key in _summary_cache:
+            _summary_cache.move_to_end(key)
+            return _summary_cache[key]
+    summary = None
+    scan = scan_file(file, max_file_size)
+    if not scan.skipped:
+        symbols, imports = _python_symbols(file, rel)
+        summary = FileSummary(path=rel, symbols=symbols, loc=scan.newlines + 1, imports=imports)
+    with _summary_lock:
+        _summary_cache[key] = summary
+        while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+    return summary
 
 
-def build_file_summaries(repo: Path) -> List[FileSummary]:
+def collect_summaries(
+    repo: Path,
+    max_file_size: int | None = MAX_FILE_SIZE,
+    budget: Budget | None = None,
+    changed: Iterable[str] = (),
+) -> Tuple[List[FileSummary], List[str]]:
+    """Summarize Python files under ``repo`` within ``budget``.
+
+    Files are visited in :func:`~scratchbot.budget.prioritize` order when a
+    budget is given. Returns the summaries and the relative paths left
+    unprocessed when the budget ran out.
+    """
+    files = {file.relative_to(repo).as_posix(): file for file in repo.rglob("*.py")}
+    order = prioritize(files, changed) if budget is not None else list(files)
     summaries: List[FileSummary] = []
-    for file in repo.rglob("*.py"):
-        rel = file.relative_to(repo).as_posix()
-        text = file.read_text(encoding="utf-8")
-        symbols = _python_symbols(file)
-        loc = text.count("\n") + 1
-        summaries.append(FileSummary(path=rel, symbols=symbols, loc=loc))
-    return summaries
+    pending: List[str] = []
+    for rel in order:
+        if budget is not None:
+            if budget.exhausted:
+                pending.append(rel)
+                continue
+            budget.charge()
+        summary = _summarize_file(files[rel], rel, max_file_size)
+        if summary is not None:
+            summaries.append(summary)
+    return summaries, pending
+
 
+def build_file_summaries(repo: Path, max_file_size: int | None = MAX_FILE_SIZE) -> List[FileSummary]:
+    """Summarize every Python file under ``repo``.
 
-def assemble_context(repo: str | Path, base_ref: str = "origin/main") -> Dict[str, object]:
+    Binary, minified, generated and oversized files are skipped before
+    parsing (see :func:`scratchbot.file_scan.scan_file`). Results are cached
+    in memory per file until its modification time or size changes.
+    """
+    return collect_summaries(repo, max_file_size)[0]
+
+
+def _related_docs(repo: Path, paths: Iterable[str]) -> List[str]:
+    docs: Set[str] = set()
+    for d in {posixpath.dirname(p) for p in paths}:
+        directory = repo / d if d else repo
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            if name.lower() in ("readme.md", "index.md"):
+                docs.add(posixpath.join(d, name) if d else name)
+    return sorted(docs)
+
+
+def _file_tree(repo: Path, budget: Budget | None) -> Tuple[List[str], bool]:
+    """List files under ``repo``; stops early once ``budget`` is spent."""
+    files: List[Path] = []
+    for path in repo.rglob("*"):
+        if budget is not None and budget.exhausted:
+            return [p.as_posix() for p in sorted(files)], False
+        if path.is_file():
+            files.append(path)
+    return [p.as_posix() for p in sorted(files)], True
+
+
+def assemble_context(
+    repo: str | Path,
+    base_ref: str = "origin/main",
+    config: ScratchbotConfig | None = None,
+    hops: int | None = RELEVANCE_HOPS,
+    budget: Budget | None = None,
+) -> Dict[str, object]:
     """Return diff, tree, symbol summaries and token count for ``repo``.
 
+    ``config`` supplies extra ``diff_exclude`` patterns, the ``diff_mode``
+    for excluded files and ``max_file_size``; it defaults to the repo's
+    ``.scratchbot.yml``. The parsed per-file records are returned under
+    ``diff_files``.
+
+    Summaries cover only files within ``hops`` import edges of the changed
+    files, and ``docs`` lists the README/index files of their directories.
+    Pass ``hops=None`` (or an empty diff) to summarize every file.
+
+    With a ``budget``, files are summarized changed-first and whatever is
+    left at the deadline is reported under ``coverage`` with ``partial``
+    set. The import-graph filter still applies to the summaries that were
+    collected, JS/TS reads for the graph are charged to the same budget, and
+    the file tree walk stops once it is spent (``file_tree_complete`` in
+    ``coverage``).
+
     Raises ``ValueError`` if the approximate token count exceeds
     ``TOKEN_LIMIT``.
     """
     repo = Path(repo)
-    diff = subprocess.run(
-        ["git", "-C", str(repo), "diff", f"{base_ref}...HEAD"],
-        capture_output=True,
-        text=True,
-        check=True,
-    ).stdout
-
-    tree_lines = [p.as_posix() for p in sorted(repo.rglob("*")) if p.is_file()]
-    tree = "\n".join(tree_lines)
+    if config is None:
+        config = ScratchbotConfig.from_file(repo / ".scratchbot.yml")
+    exclude = DEFAULT_DIFF_EXCLUDE + list(config.diff_exclude)
+    diff_files = list(iter_git_diff(repo, base_ref, exclude))
+    diff = render_diff(diff_files, config.diff_mode)
 
-    summaries = build_file_summaries(repo)
+    changed = {f.path for f in diff_files} | {f.old_path for f in diff_files if f.old_path}
+    summaries, pending = collect_summaries(repo, config.max_file_size, budget, sorted(changed))
+    analyzed = len(summaries)
+    docs: List[str] = []
+    if hops is not None and changed:
+        deleted = [p for p in changed if not (repo / p).exists()]
+        graph = build_import_graph(
+            repo, {s.path: s.imports for s in summaries}, config.max_file_size, deleted,
+            budget, sorted(changed),
+        )
+        pending += graph.pending
+        relevant = graph.related(changed, hops)
+        summaries = [s for s in summaries if s.path in relevant]
+        docs = _related_docs(repo, relevant)
+
+    tree_lines, tree_complete = _file_tree(repo, budget)
+    tree = "\n".join(tree_lines)
     summaries_text = "\n".join(
         f"{s.path}: {', '.join(s.symbols)}" for s in summaries
     )
 
-    total_tokens = _token_count(diff) + _token_count(tree) + _token_count(summaries_text)
+    total_tokens = (
+        _token_count(diff) + _token_count(tree) + _token_count(summaries_text) + len(docs)
+    )
     if total_tokens > TOKEN_LIMIT:
         raise ValueError("context exceeds token limit")
 
     return {
         "diff": diff,
+        "diff_files": diff_files,
         "file_tree": tree,
         "summaries": summaries,
+        "docs": docs,
         "tokens": total_tokens,
+        "partial": bool(pending) or not tree_complete,
+        "coverage": {
+            "files_analyzed": analyzed,
+            "files_skipped": len(pending),
+            "incomplete_dirs": sorted({posixpath.dirname(p) or "." for p in pending}),
+            "file_tree_complete": tree_complete,
+        },
     }
@@ -8,26 +8,267 @@ the API key in ``OPENAI_API_KEY``.
 
 By default the helper targets the ``gpt-5`` model. Set ``OPENAI_MODEL`` to
 override the model name when contacting the API.
+
+Real requests go through a process-wide :class:`ModelClient` (see
+:func:`get_model_client`) which reuses one connection, rate limits requests
+and tokens per minute with token buckets, retries transient failures with
+jittered exponential backoff and coalesces identical prompts that are in
+flight at the same time. ``SCRATCHBOT_MODEL_RPM`` and ``SCRATCHBOT_MODEL_TPM``
+set the limits; ``SCRATCHBOT_MODEL_URL`` sends requests to a Responses-API
+compatible endpoint over plain HTTP instead of using the ``openai`` package.
+They are read when the client is created; call :func:`reset_model_client`
+after changing them in a running process.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional, Tuple
+
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
 
 
 class PlanError(RuntimeError):
     """Raised when the model output cannot be parsed."""
 
 
+class TransientModelError(RuntimeError):
+    """Raised by transports for failures worth retrying (rate limits, 5xx)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``per_minute`` tokens per minute.
+
+    ``acquire`` blocks until enough tokens are available. Requests larger
+    than the bucket capacity are clamped so they can still proceed.
+    """
+
+    def __init__(
+        self,
+        per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> None:
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            self._sleep(wait)
+
+
+class HTTPTransport:
+    """Call a Responses-API compatible endpoint with a pooled HTTP session."""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout: float = 120):
+        import requests
+
+        self.url = base_url.rstrip("/") + "/responses"
+        self.timeout = timeout
+        self._requests = requests
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def __call__(self, model: str, prompt: str) -> str:
+        try:
+            resp = self.session.post(
+                self.url, json={"model": model, "input": prompt}, timeout=self.timeout
+            )
+        except self._requests.RequestException as exc:
+            raise TransientModelError(f"model request failed: {exc}") from exc
+        if resp.status_code in TRANSIENT_STATUS:
+            retry_after = resp.headers.get("Retry-After")
+            raise TransientModelError(
+                f"model returned HTTP {resp.status_code}",
+                float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        resp.raise_for_status()
+        data = resp.json()
+        if "output_text" in data:
+            return data["output_text"]
+        return "".join(
+            part.get("text", "")
+            for item in data.get("output", [])
+            for part in item.get("content", []) or []
+            if part.get("type") == "output_text"
+        )
+
+
+class _OpenAITransport:
+    """Transport backed by a single, lazily created ``openai.OpenAI`` client."""
+
+    _TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+    def __init__(self) -> None:
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __call__(self, model: str, prompt: str) -> str:
+        with self._lock:
+            if self._client is None:
+                try:
+                    from openai import OpenAI  # type: ignore
+                except Exception as exc:  # pragma: no cover - requires optional dep
+                    raise RuntimeError(
+                        "openai package not installed; set SCRATCHBOT_PLAN_JSON for tests"
+                    ) from exc
+                # ModelClient owns retries; SDK retries would bypass the buckets
+                self._client = OpenAI(max_retries=0)
+        try:
+            response = self._client.responses.create(model=model, input=prompt)
+        except Exception as exc:
+            if (
+                getattr(exc, "status_code", None) in TRANSIENT_STATUS
+                or type(exc).__name__ in self._TRANSIENT_ERRORS
+            ):
+                raise TransientModelError(str(exc)) from exc
+            raise
+        return response.output_text
+
+
+class ModelClient:
+    """Shared, rate-limited model client.
+
+    ``transport`` is a callable ``(model, prompt) -> str`` that performs one
+    request and raises :class:`TransientModelError` for retryable failures.
+    Concurrent calls with the same model and prompt share a single request.
+    The instance is callable, so it can be passed as ``call_model`` to
+    :func:`generate_docs_plan`.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[Callable[[str, str], str]] = None,
+        model: Optional[str] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.transport = transport or _OpenAITransport()
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self._requests = TokenBucket(requests_per_minute, sleep=sleep) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, sleep=sleep) if tokens_per_minute else None
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def complete(self, prompt: str) -> str:
+        """Return the model output for ``prompt``, blocking the caller."""
+        model = self.model or os.environ.get("OPENAI_MODEL", "gpt-5")
+        key = (model, prompt)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+        try:
+            result = self._request_with_retries(model, prompt)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    __call__ = complete
+
+    async def acomplete(self, prompt: str) -> str:
+        """Async variant of :meth:`complete`; runs the request in a worker thread."""
+        return await asyncio.to_thread(self.complete, prompt)
+
+    def _request_with_retries(self, model: str, prompt: str) -> str:
+        attempt = 0
+        while True:
+            if self._requests is not None:
+                self._requests.acquire(1)
+            if self._tokens is not None:
+                self._tokens.acquire(len(prompt.split()))
+            try:
+                return self.transport(model, prompt)
+            except TransientModelError as exc:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                delay = random.uniform(0, delay)  # full jitter
+                if exc.retry_after is not None:
+                    delay = max(delay, exc.retry_after)
+                self._sleep(delay)
+                attempt += 1
+
+
+_default_client: Optional[ModelClient] = None
+_default_lock = threading.Lock()
+
+
+def get_model_client() -> ModelClient:
+    """Return the process-wide :class:`ModelClient`, creating it on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            url = os.environ.get("SCRATCHBOT_MODEL_URL")
+            transport = HTTPTransport(url, os.environ.get("OPENAI_API_KEY")) if url else None
+            rpm = os.environ.get("SCRATCHBOT_MODEL_RPM")
+            tpm = os.environ.get("SCRATCHBOT_MODEL_TPM")
+            _default_client = ModelClient(
+                transport,
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None,
+            )
+        return _default_client
+
+
+def reset_model_client() -> None:
+    """Drop the process-wide client so the next call re-reads the environment."""
+    global _default_client
+    with _default_lock:
+        _default_client = None
+
+
 def call_openai(prompt: str) -> str:
     """Return model output for ``prompt``.
 
     ``SCRATCHBOT_PLAN_JSON`` may point to a JSON file used for deterministic
-    testing. When unset, the function attempts to call the real OpenAI API
-    using the ``openai`` package. Set ``OPENAI_API_KEY`` and optionally
+    testing. When unset, the function calls the real OpenAI API through the
+    shared :func:`get_model_client`. Set ``OPENAI_API_KEY`` and optionally
     ``OPENAI_MODEL`` to choose the model name. When unset, ``gpt-5`` is used.
     """
 
@@ -35,17 +276,7 @@ def call_openai(prompt: str) -> str:
     if stub_path:
         return Path(stub_path).read_text(encoding="utf-8")
 
-    try:
-        from openai import OpenAI  # type: ignore
-    except Exception as exc:  # pragma: no cover - requires optional dep
-        raise RuntimeError(
-            "openai package not installed; set SCRATCHBOT_PLAN_JSON for tests"
-        ) from exc
-
-    client = OpenAI()
-    model = os.environ.get("OPENAI_MODEL", "gpt-5")
-    response = client.responses.create(model=model, input=prompt)
-    return response.output_text
+    return get_model_client().complete(prompt)
 
 
 def generate_docs_plan(
@@ -56,7 +287,9 @@ def generate_docs_plan(
 
     ``call_model`` defaults to :func:`call_openai`. The callable must accept a
     single string prompt and return the model's raw text response. The response
-    is parsed as JSON with ``missing`` and ``needs_update`` lists.
+    is parsed as JSON with ``missing`` and ``needs_update`` lists. A
+    ``partial`` context (see ``assemble_context``'s ``budget``) is planned
+    as-is, with a note in the prompt.
     """
 
     if call_model is None:
@@ -77,6 +310,16 @@ def generate_docs_plan(
     prompt += "\nSymbols:\n" + ", ".join(
         f"{s.path}: {', '.join(s.symbols)}" for s in context.get("summaries", [])
     )
+    if context.get("docs"):
+        prompt += "\nRelated Docs:\n" + "\n".join(context["docs"])
+    if context.get("partial"):
+        coverage = context.get("coverage", {})
+        prompt += (
+            "\nNote: analysis stopped at its deadline; symbols for"
+            f" {coverage.get('files_skipped', 'some')} files"
+            " (changed files were analyzed first) are missing. Plan from what is"
+            " available."
+        )
 
     raw = call_model(prompt)
     try:
@@ -0,0 +1,262 @@
+"""Watch mode for the analyzer.
+
+:func:`watch_repo` keeps a :class:`~scratchbot.analyze.RepoState` in memory
+and re-analyzes only the files touched since the last pass. Change
+notifications come from inotify (through ``ctypes``, no extra dependency)
+when available, otherwise from a polling watcher that compares file
+modification times. The current result is re-emitted as JSON on every
+change and can optionally be served over a local Unix socket.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import socketserver
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .analyze import SKIP_DIRS, RepoState
+from .file_scan import MAX_FILE_SIZE
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+# Editors often write a file in several syscalls; wait this long after the
+# first event so one save yields one re-analysis.
+SETTLE_SECONDS = 0.05
+
+
+def _skip_dir(name: str) -> bool:
+    return name in SKIP_DIRS or name.startswith(".")
+
+
+def _walk_dirs(root: str):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not _skip_dir(d)]
+        yield dirpath, filenames
+
+
+class PollingWatcher:
+    """Detect changes by comparing ``(mtime, size)`` snapshots."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for dirpath, filenames in _walk_dirs(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout: float) -> Set[str]:
+        """Sleep ``timeout`` seconds and return the paths that changed."""
+        time.sleep(timeout)
+        current = self._take_snapshot()
+        previous = self._snapshot
+        self._snapshot = current
+        changed = {p for p, sig in current.items() if previous.get(p) != sig}
+        changed.update(p for p in previous if p not in current)
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Recursive watcher built on the Linux inotify API."""
+
+    def __init__(self, root: str):
+        libc_name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._libc = libc
+        self.root = os.path.abspath(root)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        try:
+            self._add_tree(self.root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, top: str) -> None:
+        for dirpath, _ in _walk_dirs(top):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dirpath}")
+            self._dirs[wd] = dirpath
+
+    def _read_events(self, changed: Set[str]) -> None:
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                changed.add(self.root)
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            dirpath = self._dirs.get(wd)
+            if dirpath is None:
+                continue
+            name_str = os.fsdecode(name)
+            if mask & _IN_ISDIR and _skip_dir(name_str):
+                # vendored/virtualenv trees are never analyzed or watched
+                continue
+            path = os.path.join(dirpath, name_str) if name else dirpath
+            changed.add(path)
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                try:
+                    self._add_tree(path)
+                except OSError:
+                    pass
+
+    def wait(self, timeout: float) -> Set[str]:
+        """Block up to ``timeout`` seconds and return the paths that changed."""
+        changed: Set[str] = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+        self._read_events(changed)
+        deadline = time.monotonic() + SETTLE_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if ready:
+                self._read_events(changed)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(root: str, force_poll: bool = False):
+    """Return an :class:`InotifyWatcher` when possible, else a poller."""
+    if not force_poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root)
+
+
+class _ResultHolder:
+    def __init__(self, result: Dict[str, object]):
+        self._lock = threading.Lock()
+        self._payload = b""
+        self.set(result)
+
+    def set(self, result: Dict[str, object]) -> None:
+        payload = json.dumps(result, indent=2).encode("utf-8")
+        with self._lock:
+            self._payload = payload
+
+    def get(self) -> bytes:
+        with self._lock:
+            return self._payload
+
+
+def serve_result(holder: _ResultHolder, socket_path: str) -> socketserver.BaseServer:
+    """Serve the latest JSON result to every client connecting to ``socket_path``."""
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self) -> None:
+            self.request.sendall(holder.get())
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _print_result(result: Dict[str, object]) -> None:
+    print(json.dumps(result, indent=2), flush=True)
+
+
+def watch_repo(
+    root: str,
+    baseline_path: Optional[str] = None,
+    interval: float = 1.0,
+    socket_path: Optional[str] = None,
+    force_poll: bool = False,
+    emit: Callable[[Dict[str, object]], None] | None = None,
+    stop: Optional[threading.Event] = None,
+    max_file_size: Optional[int] = MAX_FILE_SIZE,
+) -> None:
+    """Analyze ``root`` and keep the result current until interrupted.
+
+    ``emit`` receives the full result after the initial scan and after every
+    change; it defaults to printing JSON to stdout. ``stop`` may be set from
+    another thread to end the loop.
+    """
+    if emit is None:
+        emit = _print_result
+    state = RepoState(root, baseline_path, max_file_size)
+    state.scan()
+    result = state.result()
+    holder = _ResultHolder(result)
+    emit(result)
+
+    server = serve_result(holder, socket_path) if socket_path else None
+    watcher = make_watcher(state.root, force_poll)
+    try:
+        while stop is None or not stop.is_set():
+            changed = watcher.wait(interval)
+            if not changed:
+                continue
+            if state.root in changed:
+                # inotify queue overflow: events were lost, start over
+                state.scan()
+            elif not state.update(sorted(changed)):
+                continue
+            result = state.result()
+            holder.set(result)
+            emit(result)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
@@ -0,0 +1,138 @@
+import json
+
+from scratchbot import assemble_context, generate_docs_plan
+from scratchbot.analyze import analyze_repo
+from scratchbot.budget import Budget, prioritize
+
+
+def test_budget_limits():
+    now = [0.0]
+    budget = Budget(seconds=5, clock=lambda: now[0])
+    assert not budget.exhausted
+    now[0] = 5.0
+    assert budget.exhausted
+
+    work = Budget(max_files=2)
+    work.charge()
+    assert not work.exhausted
+    work.charge()
+    assert work.exhausted
+    assert not Budget().exhausted
+
+
+def test_prioritize_changed_then_nearby():
+    paths = ["z.py", "other/x.py", "pkg/sub/deep/d.py", "pkg/b.py", "pkg/sub/a.py", "pkg/sub/c.py"]
+    assert prioritize(paths, ["pkg/sub/c.py"]) == [
+        "pkg/sub/c.py",
+        "pkg/sub/deep/d.py",
+        "pkg/b.py",
+        "pkg/sub/a.py",
+        "z.py",
+        "other/x.py",
+    ]
+
+
+def _make_tree(root):
+    for d in ("a", "b", "c"):
+        (root / d).mkdir()
+        for i in range(3):
+            (root / d / f"m{i}.py").write_text(f"def f{i}():\n    pass\n")
+
+
+def test_analyze_repo_returns_partial_result(tmp_path):
+    _make_tree(tmp_path)
+    result = analyze_repo(str(tmp_path), budget=Budget(max_files=4), changed=["b/m2.py"])
+    analyzed = [p["path"] for p in result["python"]]
+    assert analyzed[0] == "b/m2.py"
+    assert sorted(analyzed[1:3]) == ["b/m0.py", "b/m1.py"]
+    assert result["partial"] is True
+    assert result["coverage"]["files_analyzed"] == 4
+    assert result["coverage"]["files_skipped"] == 5
+    assert "b" not in result["coverage"]["incomplete_dirs"]
+
+    full = analyze_repo(str(tmp_path))
+    assert full["partial"] is False
+    assert full["coverage"] == {
+        "files_analyzed": 9, "files_skipped": 0, "incomplete_dirs": [], "unchecked_baseline": [],
+    }
+
+
+def test_partial_result_does_not_invent_baseline_changes(tmp_path):
+    (tmp_path / "a.py").write_text("def a():\n    pass\n")
+    (tmp_path / "b.py").write_text("def b():\n    pass\n")
+    for name, lines in (("big", 400), ("small", 200)):
+        (tmp_path / name).mkdir()
+        for i in range(2):
+            (tmp_path / name / f"m{i}.py").write_text("x = 1\n" * lines)
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"functions": {"a.py": {"a": "()"}, "b.py": {"b": "()"}}}))
+
+    changed = ["a.py", "big/m0.py", "small/m0.py"]
+    result = analyze_repo(str(tmp_path), str(baseline), budget=Budget(max_files=3), changed=changed)
+    assert result["partial"] is True
+    assert result["needs_update"] == []
+    assert result["coverage"]["unchecked_baseline"] == ["b.py"]
+    # counted lines are lower bounds: big/ is certain, small/ is only flagged
+    assert result["coverage"]["incomplete_dirs"] == [".", "big", "small"]
+    assert "big" in result["missing_docs"]
+    assert "small" not in result["missing_docs"]
+
+    full = analyze_repo(str(tmp_path), str(baseline))
+    assert full["needs_update"] == []
+    assert {"big", "small"} <= set(full["missing_docs"])
+
+
+def test_assemble_context_partial_result_feeds_planning(tmp_path, git):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_tree(repo)
+    git(repo, "init", "-b", "main")
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "base")
+    (repo / "c" / "m1.py").write_text("def g():\n    pass\n")
+    git(repo, "commit", "-am", "change")
+
+    context = assemble_context(repo, base_ref="HEAD~1", budget=Budget(max_files=1))
+    assert [s.path for s in context["summaries"]] == ["c/m1.py"]
+    assert context["partial"] is True
+    assert context["coverage"]["files_skipped"] == 8
+
+    prompts = []
+
+    def model(prompt):
+        prompts.append(prompt)
+        return '{"missing": [], "needs_update": []}'
+
+    assert generate_docs_plan(context, model) == {"missing": [], "needs_update": []}
+    assert "analysis stopped at its deadline" in prompts[0]
+
+
+def test_partial_context_is_still_filtered_by_relevance(tmp_path, git):
+    repo = tmp_path / "repo"
+    (repo / "pkg").mkdir(parents=True)
+    (repo / "pkg" / "__init__.py").write_text("")
+    (repo / "pkg" / "core.py").write_text("def core():\n    pass\n")
+    (repo / "pkg" / "api.py").write_text("from .core import core\n")
+    for i in range(4):
+        (repo / "pkg" / f"other{i}.py").write_text(f"def other{i}():\n    pass\n")
+    (repo / "web").mkdir()
+    (repo / "web" / "app.js").write_text("import './util';\n")
+    (repo / "web" / "util.js").write_text("export const x = 1;\n")
+    git(repo, "init", "-b", "main")
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "base")
+    (repo / "pkg" / "core.py").write_text("def core(x):\n    pass\n")
+    git(repo, "commit", "-am", "change")
+
+    context = assemble_context(repo, base_ref="HEAD~1", budget=Budget(max_files=6))
+    assert context["partial"] is True
+    # six of seven Python files were summarized but only related ones are kept
+    assert sorted(s.path for s in context["summaries"]) == ["pkg/api.py", "pkg/core.py"]
+    # the graph's JS reads and the tree walk were skipped once the budget ran out
+    assert context["coverage"]["files_skipped"] == 1 + 2
+    assert "web" in context["coverage"]["incomplete_dirs"]
+    assert context["coverage"]["file_tree_complete"] is False
+
+    full = assemble_context(repo, base_ref="HEAD~1")
+    assert full["coverage"]["file_tree_complete"] is True
+    assert len(context["file_tree"]) < len(full["file_tree"])
@@ -8,6 +8,8 @@ def test_config_defaults(tmp_path):
     assert cfg.include == []
     assert cfg.exclude == []
     assert cfg.thresholds == {}
+    assert cfg.diff_exclude == []
+    assert cfg.diff_mode == "summarize"
 
 
 def test_config_parsing(tmp_path):
@@ -21,6 +23,8 @@ exclude: ["tests/**"]
 thresholds:
   loc: 300
   files: 10
+diff_exclude: ["*_pb2.py"]
+diff_mode: drop
 """,
         encoding="utf-8",
     )
@@ -30,3 +34,5 @@ thresholds:
     assert cfg.include == ["src/**"]
     assert cfg.exclude == ["tests/**"]
     assert cfg.thresholds == {"loc": 300, "files": 10}
+    assert cfg.diff_exclude == ["*_pb2.py"]
+    assert cfg.diff_mode == "drop"
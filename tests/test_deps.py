@@ -0,0 +1,190 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from scratchbot.analyze import parse_pnpm_lock, parse_requirements
+from scratchbot.deps import (
+    MetadataCache,
+    MetadataError,
+    MirrorFetcher,
+    RegistryFetcher,
+    fetch_dependency_metadata,
+    normalize_name,
+)
+
+NPM_DOCS = {
+    "left-pad": {
+        "dist-tags": {"latest": "1.3.0"},
+        "versions": {"1.3.0": {"description": "String left pad", "license": "WTFPL"}},
+    },
+}
+PYPI_DOCS = {
+    "requests": {"info": {"version": "2.32.0", "summary": "HTTP for Humans.", "license": "Apache-2.0"}},
+}
+
+
+@pytest.fixture
+def registry(local_server):
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            parts = self.path.strip("/").split("/")
+            doc = None
+            if parts[0] == "npm":
+                doc = NPM_DOCS.get(parts[1])
+            elif parts[0] == "pypi" and parts[-1] == "json":
+                doc = PYPI_DOCS.get(parts[1])
+            if doc is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = json.dumps(doc).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    root = local_server(Handler)
+    fetcher = RegistryFetcher(npm_root=f"{root}/npm", pypi_root=f"{root}/pypi")
+    return fetcher, hits
+
+
+DEPS = {"npm": ["left-pad"], "pip": ["requests"]}
+
+
+def test_fetch_uses_registry_then_cache(tmp_path, registry):
+    fetcher, hits = registry
+    cache = MetadataCache(tmp_path / "cache")
+    result = fetch_dependency_metadata(DEPS, cache=cache, fetcher=fetcher, offline=False)
+    assert result["npm"]["left-pad"]["version"] == "1.3.0"
+    assert result["npm"]["left-pad"]["description"] == "String left pad"
+    assert result["pip"]["requests"]["description"] == "HTTP for Humans."
+    assert len(hits) == 2
+
+    again = fetch_dependency_metadata(DEPS, cache=cache, fetcher=fetcher, offline=False)
+    assert again == result
+    assert len(hits) == 2
+
+
+def test_expired_entry_is_refetched(tmp_path, registry):
+    fetcher, hits = registry
+    cache = MetadataCache(tmp_path / "cache", ttl=-1)
+    fetch_dependency_metadata(DEPS, cache=cache, fetcher=fetcher, offline=False)
+    fetch_dependency_metadata(DEPS, cache=cache, fetcher=fetcher, offline=False)
+    assert len(hits) == 4
+
+
+def test_failed_fetch_falls_back_to_stale_entry(tmp_path):
+    cache = MetadataCache(tmp_path / "cache", ttl=-1)
+    cache.put("pip", "requests", {"version": "1.0"})
+
+    def broken(ecosystem, name):
+        raise MetadataError("down")
+
+    result = fetch_dependency_metadata({"pip": ["requests", "missing"]}, cache=cache, fetcher=broken, offline=False)
+    assert result == {"pip": {"requests": {"version": "1.0"}}}
+
+
+def test_offline_mode_reads_mirror(tmp_path):
+    mirror = tmp_path / "mirror"
+    (mirror / "pip").mkdir(parents=True)
+    (mirror / "pip" / "requests.json").write_text(json.dumps(PYPI_DOCS["requests"]))
+
+    def network(ecosystem, name):
+        raise AssertionError("network used in offline mode")
+
+    cache = MetadataCache(tmp_path / "cache")
+    result = fetch_dependency_metadata(
+        {"pip": ["requests"], "npm": ["left-pad"]},
+        cache=cache, fetcher=network, offline=True, mirror_dir=mirror,
+    )
+    assert result == {"pip": {"requests": {
+        "version": "2.32.0", "description": "HTTP for Humans.", "homepage": None, "license": "Apache-2.0",
+    }}, "npm": {}}
+
+
+def test_cache_is_shared_and_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr("scratchbot.deps.GC_GRACE_SECONDS", 0)
+    first = MetadataCache(tmp_path / "cache", max_bytes=60)
+    first.put("pip", "a", {"version": "1", "description": "x" * 20})
+    second = MetadataCache(tmp_path / "cache", max_bytes=60)
+    assert second.get("pip", "A") == {"version": "1", "description": "x" * 20}
+
+    second.put("pip", "b", {"version": "2", "description": "y" * 20})
+    second.prune()
+    assert second.get("pip", "b") is not None
+    assert second.get("pip", "a") is None
+
+    second.put("pip", "c", {"version": "2", "description": "y" * 20})
+    second.prune()
+    # identical documents share one content-addressed object
+    assert len(list((tmp_path / "cache" / "objects").glob("*/*.json"))) == 1
+
+
+def test_requirement_entries_are_normalized(tmp_path, registry):
+    reqs = tmp_path / "requirements.txt"
+    reqs.write_text(
+        "requests[socks]~=2.31\n"
+        "requests; python_version >= '3.8'\n"
+        "-r dev.txt\n"
+        "-e .\n"
+        "https://example.com/pkg.tar.gz\n"
+        "../x\n"
+    )
+    names = parse_requirements(str(reqs))
+    assert [normalize_name("pip", n) for n in names] == ["requests", "requests", None, None, None, None]
+    assert normalize_name("npm", "@types/node") == "@types/node"
+    assert normalize_name("npm", "../x") is None
+
+    fetcher, hits = registry
+    result = fetch_dependency_metadata(
+        {"pip": names}, cache=MetadataCache(tmp_path / "cache"), fetcher=fetcher, offline=False
+    )
+    assert list(result["pip"]) == ["requests"]
+    assert hits == ["/pypi/requests/json"]
+
+
+def test_fetchers_quote_and_reject_unsafe_names(tmp_path, registry):
+    fetcher, hits = registry
+    with pytest.raises(MetadataError):
+        fetcher("npm", "@scope/pkg")
+    with pytest.raises(MetadataError):
+        fetcher("pip", "a/../b")
+    assert hits == ["/npm/@scope%2Fpkg", "/pypi/a%2F..%2Fb/json"]
+
+    mirror = tmp_path / "mirror"
+    (mirror / "npm").mkdir(parents=True)
+    (mirror / "npm" / "@scope%2Fpkg.json").write_text(json.dumps(NPM_DOCS["left-pad"]))
+    (tmp_path / "x.json").write_text(json.dumps(PYPI_DOCS["requests"]))
+    mirror_fetcher = MirrorFetcher(mirror)
+    assert mirror_fetcher("npm", "@scope/pkg")["version"] == "1.3.0"
+    with pytest.raises(MetadataError):
+        mirror_fetcher("pip", "../../x")
+
+
+def test_pnpm_lock_names(tmp_path):
+    v6 = tmp_path / "v6.yaml"
+    v6.write_text(
+        "lockfileVersion: '6.0'\n"
+        "dependencies:\n"
+        "  '@types/node':\n"
+        "    specifier: ^20.0.0\n"
+        "    version: 20.1.0\n"
+        "  react:\n"
+        "    specifier: ^18.2.0\n"
+        "    version: 18.2.0\n"
+        "packages:\n"
+        "  /react@18.2.0:\n"
+    )
+    v5 = tmp_path / "v5.yaml"
+    v5.write_text("lockfileVersion: 5.4\ndependencies:\n  left-pad: 1.3.0\n  '@scope/pkg': 2.0.0\n")
+    assert parse_pnpm_lock(str(v6)) == ["@types/node", "react"]
+    assert parse_pnpm_lock(str(v5)) == ["left-pad", "@scope/pkg"]
+    assert [normalize_name("npm", n) for n in parse_pnpm_lock(str(v6))] == ["@types/node", "react"]
@@ -0,0 +1,112 @@
+from scratchbot import analyze
+from scratchbot.analyze import analyze_repo, non_blank_lines
+from scratchbot import file_scan
+from scratchbot.file_scan import MINIFIED_LINE_LENGTH, MMAP_THRESHOLD, scan_file
+
+
+def test_counts_match_text_helpers(tmp_path):
+    text = "a = 1\n\n   \n\tb = 2\r\n\nc = 3"
+    path = tmp_path / "mod.py"
+    path.write_bytes(text.encode())
+    scan = scan_file(path)
+    assert scan.skip_reason is None
+    assert scan.non_blank == non_blank_lines(text) == 3
+    assert scan.newlines == text.count("\n")
+
+
+def test_large_files_are_memory_mapped(tmp_path):
+    path = tmp_path / "big.py"
+    line = b"x = 1\n\n"
+    path.write_bytes(line * (MMAP_THRESHOLD // len(line) + 10))
+    scan = scan_file(path)
+    assert scan.newlines == 2 * (MMAP_THRESHOLD // len(line) + 10)
+    assert scan.non_blank == scan.newlines // 2
+
+
+def test_detects_files_to_skip(tmp_path):
+    cases = {
+        "blob.py": b"x = 1\n\x00\x01\x02",
+        "bundle.js": b"var a=1;" * 200 + b"\n",
+        "app.js": b"console.log(1);\n//# sourceMappingURL=app.js.map\n",
+        "gen.py": b"# @" + b"generated by protoc\nx = 1\n",
+        "vendor.min.js": b"var a = 1;\n",
+    }
+    reasons = {}
+    for name, data in cases.items():
+        (tmp_path / name).write_bytes(data)
+        reasons[name] = scan_file(tmp_path / name).skip_reason
+    assert reasons == {
+        "blob.py": "binary",
+        "bundle.js": "minified",
+        "app.js": "generated",
+        "gen.py": "generated",
+        "vendor.min.js": "generated",
+    }
+    big = tmp_path / "big.py"
+    big.write_bytes(b"x = 1\n" * 10)
+    assert scan_file(big, max_size=10).skip_reason == "too_large"
+    assert scan_file(big, max_size=None).skip_reason is None
+
+
+def test_analyze_repo_skips_before_parsing(tmp_path, monkeypatch):
+    (tmp_path / "ok.py").write_text("def ok():\n    pass\n")
+    (tmp_path / "blob.py").write_bytes(b"\x00\xff\xfe not python")
+    (tmp_path / "huge.py").write_text("x = 1\n" * 100)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("parser invoked on a skipped file")
+
+    monkeypatch.setattr(analyze, "analyze_js_ts_file", fail)
+    result = analyze_repo(str(tmp_path), max_file_size=100)
+    assert [p["path"] for p in result["python"]] == ["ok.py"]
+    assert result["skipped"] == [
+        {"path": "blob.py", "reason": "binary"},
+        {"path": "huge.py", "reason": "too_large"},
+    ]
+
+
+def test_js_fallback_handles_non_utf8(tmp_path, monkeypatch):
+    path = tmp_path / "legacy.js"
+    path.write_bytes(b"// caf\xe9\nvar a = 1;\n")
+    monkeypatch.setattr(analyze, "TS_PARSER", str(tmp_path / "missing.js"))
+    data = analyze.analyze_js_ts_file(str(path))
+    assert data["lines"] == 2
+
+
+def test_minified_threshold_and_chunk_boundaries(tmp_path, monkeypatch):
+    short = b"x" * (MINIFIED_LINE_LENGTH - 1) + b"\n"
+    long = b"x" * MINIFIED_LINE_LENGTH + b"\n"
+    path = tmp_path / "mod.js"
+    path.write_bytes(short * 50)
+    scan = scan_file(path)
+    assert (scan.skip_reason, scan.newlines) == (None, 50)
+    path.write_bytes(short * 50 + long + short)
+    assert scan_file(path).skip_reason == "minified"
+    path.write_bytes(short * 50 + long.rstrip(b"\n"))
+    assert scan_file(path).skip_reason == "minified"
+
+    # a long line straddling chunk boundaries is still found
+    monkeypatch.setattr(file_scan, "CHUNK_SIZE", 64)
+    path.write_bytes(b"a\n" + b"y" * MINIFIED_LINE_LENGTH + b"\nb\n")
+    assert scan_file(path).skip_reason == "minified"
+    path.write_bytes(short * 3)
+    assert file_scan.count_lines(path.read_bytes())[0] == 3
+    assert scan_file(path).skip_reason is None
+
+
+def test_prose_mentioning_markers_is_not_generated(tmp_path):
+    path = tmp_path / "api.py"
+    path.write_text(
+        '"""Public API.\n\n'
+        "The reference pages are auto-" "generated by Sphinx; DO NOT " "EDIT them by hand.\n"
+        "Code generated " "by protoc lives in proto/.\n"
+        '"""\n\n\ndef handler():\n    pass\n'
+    )
+    assert scan_file(path).skip_reason is None
+
+    go = tmp_path / "types.go"
+    go.write_text("// Code generated by stringer; DO NOT " "EDIT.\n\npackage types\n")
+    assert scan_file(go).skip_reason == "generated"
+    js = tmp_path / "schema.js"
+    js.write_text("/**\n * @" "generated SignedSource<<abc>>\n */\nexport const a = 1;\n")
+    assert scan_file(js).skip_reason == "generated"
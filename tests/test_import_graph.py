@@ -0,0 +1,131 @@
+import ast
+from concurrent.futures import ThreadPoolExecutor
+
+from scratchbot import assemble_context, import_graph, plan_builder
+from scratchbot.import_graph import build_import_graph, js_imports, python_imports
+from scratchbot.plan_builder import build_file_summaries
+
+
+def test_python_imports_resolve_relative_modules():
+    tree = ast.parse(
+        "import os\n"
+        "import pkg.util\n"
+        "from . import sibling\n"
+        "from ..core import engine\n"
+        "from .helpers import *\n"
+    )
+    assert python_imports(tree, "pkg/sub/mod.py") == [
+        "os",
+        "pkg.util",
+        "pkg.sub.sibling",
+        "pkg.sub",
+        "pkg.core.engine",
+        "pkg.core",
+        "pkg.sub.helpers",
+    ]
+
+
+def test_js_imports_collects_specifiers():
+    source = (
+        "import React from 'react';\n"
+        "import { a, b } from \"./lib/a\";\n"
+        "export * from './b';\n"
+        "import './side-effect';\n"
+        "const c = require('../c');\n"
+        "const d = await import('./d.js');\n"
+    )
+    assert js_imports(source) == ["react", "./lib/a", "./b", "./side-effect", "../c", "./d.js"]
+
+
+def test_graph_related_walks_both_directions(tmp_path):
+    (tmp_path / "web").mkdir()
+    (tmp_path / "web" / "index.ts").write_text("import { api } from './api';\n")
+    (tmp_path / "web" / "api.ts").write_text("const h = require('./http');\n")
+    (tmp_path / "web" / "http.ts").write_text("export const x = 1;\n")
+    python = {
+        "pkg/__init__.py": [],
+        "pkg/a.py": ["pkg.b"],
+        "pkg/b.py": ["pkg.c", "os"],
+        "pkg/c.py": [],
+        "src/tool/main.py": ["pkg.a"],
+        "src/tool/__init__.py": [],
+        "tests/test_tool.py": ["tool.main"],
+    }
+    graph = build_import_graph(tmp_path, python)
+    assert graph.imports["pkg/a.py"] == {"pkg/b.py"}
+    assert graph.imports["tests/test_tool.py"] == {"src/tool/main.py"}
+    assert graph.imports["web/api.ts"] == {"web/http.ts"}
+
+    assert graph.related(["pkg/b.py"], 1) == {"pkg/a.py", "pkg/b.py", "pkg/c.py"}
+    assert graph.related(["pkg/b.py"], 2) == {"pkg/a.py", "pkg/b.py", "pkg/c.py", "src/tool/main.py"}
+    assert graph.related(["web/http.ts"], 2) == {"web/http.ts", "web/api.ts", "web/index.ts"}
+
+    assert build_import_graph(tmp_path, python) is graph
+    (tmp_path / "web" / "http.ts").write_text("import './index';\n")
+    assert build_import_graph(tmp_path, python) is not graph
+
+
+def test_assemble_context_limits_summaries_to_related_files(tmp_path, git):
+    repo = tmp_path / "repo"
+    pkg = repo / "pkg"
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "README.md").write_text("pkg docs")
+    (pkg / "core.py").write_text("def core():\n    pass\n")
+    (pkg / "api.py").write_text("from .core import core\n\ndef api():\n    pass\n")
+    (repo / "unrelated.py").write_text("def other():\n    pass\n")
+    git(repo, "init", "-b", "main")
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "base")
+    (pkg / "core.py").write_text("def core(x):\n    pass\n")
+    git(repo, "commit", "-am", "change core")
+
+    context = assemble_context(repo, base_ref="HEAD~1")
+    assert sorted(s.path for s in context["summaries"]) == ["pkg/api.py", "pkg/core.py"]
+    assert context["docs"] == ["pkg/README.md"]
+
+    everything = assemble_context(repo, base_ref="HEAD~1", hops=None)
+    assert "unrelated.py" in {s.path for s in everything["summaries"]}
+
+    # deleting a module keeps its (now broken) importers in the context
+    (pkg / "core.py").unlink()
+    git(repo, "commit", "-am", "drop core")
+    context = assemble_context(repo, base_ref="HEAD~1")
+    assert [s.path for s in context["summaries"]] == ["pkg/api.py"]
+    assert context["docs"] == ["pkg/README.md"]
+
+
+def test_deleted_js_module_keeps_importers(tmp_path):
+    (tmp_path / "app.ts").write_text("import { a } from './gone';\n")
+    graph = build_import_graph(tmp_path, {}, deleted=["gone.ts"])
+    assert graph.related(["gone.ts"], 1) == {"gone.ts", "app.ts"}
+
+
+def test_caches_are_safe_under_concurrent_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(plan_builder, "SUMMARY_CACHE_SIZE", 2)
+    monkeypatch.setattr(import_graph, "CACHE_SIZE", 2)
+    monkeypatch.setattr(import_graph, "GRAPH_CACHE_SIZE", 1)
+    repos = []
+    for n in range(4):
+        repo = tmp_path / f"repo{n}"
+        repo.mkdir()
+        for i in range(5):
+            (repo / f"m{i}.py").write_text(f"import m{(i + 1) % 5}\n\ndef f{n}():\n    pass\n")
+            (repo / f"w{i}.js").write_text(f"import x from './w{(i + 1) % 5}';\n")
+        repos.append(repo)
+
+    def job(repo):
+        outcomes = []
+        for _ in range(20):
+            summaries = sorted(build_file_summaries(repo), key=lambda s: s.path)
+            graph = build_import_graph(repo, {s.path: s.imports for s in summaries})
+            outcomes.append((summaries, graph.imports))
+        return outcomes
+
+    expected = {repo: job(repo)[0] for repo in repos}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(job, repos * 2))
+    for repo, outcomes in zip(repos * 2, results):
+        assert all(outcome == expected[repo] for outcome in outcomes)
+    edges = expected[repos[0]][1]
+    assert edges["m0.py"] == {"m1.py"} and edges["w4.js"] == {"w0.js"}
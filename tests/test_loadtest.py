@@ -0,0 +1,48 @@
+import os
+
+import requests
+
+from scratchbot import github_api
+from scratchbot.loadtest import FakeGitHub, STAGES, format_report, percentile, run_load_test
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_fake_github_serves_github_api(monkeypatch):
+    with FakeGitHub() as fake:
+        monkeypatch.setattr(github_api, "API_ROOT", fake.url)
+        github_api.upsert_comment("o/r", 1, "plan", "t")
+        github_api.set_plan_status("o/r", "abc123", "pending", "t", description="working")
+        comments = requests.get(f"{fake.url}/repos/o/r/issues/1/comments", timeout=5).json()
+        assert [c["body"] for c in comments] == ["plan"]
+        resp = requests.patch(comments[0]["url"], json={"body": "updated"}, timeout=5)
+        assert resp.json()["body"] == "updated"
+        assert fake.statuses == [
+            {"state": "pending", "context": "scratchbot/plan", "description": "working", "repo": "o/r", "sha": "abc123"}
+        ]
+
+
+def test_run_load_test_reports_stage_latencies(tmp_path, monkeypatch):
+    for key in ("GIT_AUTHOR_NAME", "GIT_AUTHOR_EMAIL", "GIT_COMMITTER_NAME", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv("GIT_AUTHOR_NAME", "Someone")
+    original_root = github_api.API_ROOT
+    report = run_load_test(prs=3, concurrency=2, model_latency=0.01, modules=3, workdir=tmp_path)
+    assert github_api.API_ROOT == original_root
+    assert os.environ["GIT_AUTHOR_NAME"] == "Someone"
+    assert "GIT_COMMITTER_EMAIL" not in os.environ
+    assert report["failed"] == []
+    assert report["succeeded"] == 3
+    assert report["model_calls"] == 3
+    assert report["github_requests"] == 3 * 3  # GET + POST comment, POST status
+    assert set(report["latency"]) == set(STAGES) | {"total"}
+    assert report["latency"]["plan"]["p50"] >= 0.01
+    assert report["throughput_per_minute"] > 0
+    assert "PRs/min" in format_report(report)
@@ -0,0 +1,167 @@
+import textwrap
+
+from scratchbot import ScratchbotConfig, assemble_context
+from scratchbot.plan_builder import parse_unified_diff, render_diff
+
+SAMPLE_DIFF = textwrap.dedent("""\
+    diff --git a/src/app.py b/src/app.py
+    index 1111111..2222222 100644
+    --- a/src/app.py
+    +++ b/src/app.py
+    @@ -1,3 +1,4 @@
+     import os
+    --- removed line that looks like a header
+    +def run():
+    +    pass
+     x = 1
+    diff --git a/old.py b/new.py
+    similarity index 90%
+    rename from old.py
+    rename to new.py
+    @@ -1 +1 @@
+    -a = 1
+    +a = 2
+    diff --git a/package-lock.json b/package-lock.json
+    index 3333333..4444444 100644
+    --- a/package-lock.json
+    +++ b/package-lock.json
+    @@ -1,2 +1,2 @@
+    -  "version": "1.0.0"
+    +  "version": "1.0.1"
+     }
+    diff --git a/logo.png b/logo.png
+    new file mode 100644
+    index 0000000..5555555
+    Binary files /dev/null and b/logo.png differ
+""")
+
+
+def test_parse_unified_diff_records():
+    files = list(parse_unified_diff(SAMPLE_DIFF.splitlines(keepends=True)))
+    assert [f.path for f in files] == ["src/app.py", "new.py", "package-lock.json", "logo.png"]
+
+    app, renamed, lock, logo = files
+    assert (app.status, app.added, app.removed) == ("modified", 2, 1)
+    assert app.hunks[0].startswith("@@ -1,3 +1,4 @@")
+    assert "--- removed line that looks like a header" in app.hunks[0]
+    assert (renamed.status, renamed.old_path) == ("renamed", "old.py")
+    assert (lock.excluded, lock.hunks, lock.added, lock.removed) == (True, [], 1, 1)
+    assert logo.binary and logo.status == "added"
+
+
+def test_parse_unified_diff_truncates_large_files():
+    lines = ["diff --git a/big.py b/big.py\n", "@@ -0,0 +1,10 @@\n"]
+    lines += [f"+line {i}\n" for i in range(10)]
+    (big,) = parse_unified_diff(lines, max_lines=5)
+    assert big.truncated
+    assert big.added == 10
+    assert len(big.hunks[0].splitlines()) == 5
+
+
+def test_render_diff_summarizes_or_drops_excluded():
+    files = list(parse_unified_diff(SAMPLE_DIFF.splitlines()))
+    summarized = render_diff(files)
+    assert "+def run():" in summarized
+    assert "rename from old.py" in summarized
+    assert "# package-lock.json: modified generated/vendored file, +1 -1 (diff omitted)" in summarized
+    assert '"version"' not in summarized
+    assert "logo.png: added binary file" in summarized
+
+    dropped = render_diff(files, mode="drop")
+    assert "package-lock.json" not in dropped
+    assert "logo.png" not in dropped
+
+
+def test_assemble_context_filters_configured_paths(tmp_path, git):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-b", "main")
+    (repo / "mod.py").write_text("def a():\n    pass\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "base")
+    git(repo, "checkout", "-b", "feature")
+    (repo / "mod.py").write_text("def a():\n    pass\n\n\ndef b():\n    pass\n")
+    (repo / "schema_gen.py").write_text("GENERATED = 1\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "change")
+
+    cfg = ScratchbotConfig(diff_exclude=["*_gen.py"])
+    context = assemble_context(repo, base_ref="main", config=cfg)
+    assert [f.path for f in context["diff_files"]] == ["mod.py", "schema_gen.py"]
+    assert "+def b():" in context["diff"]
+    assert "GENERATED" not in context["diff"]
+    assert "# schema_gen.py: added generated/vendored file, +1 -0 (diff omitted)" in context["diff"]
+
+    # without an explicit config the repo's .scratchbot.yml is used
+    (repo / ".scratchbot.yml").write_text('diff_exclude: ["*_gen.py"]\ndiff_mode: drop\n')
+    context = assemble_context(repo, base_ref="main")
+    assert "schema_gen.py" not in context["diff"]
+    assert "+def b():" in context["diff"]
+
+
+def test_parse_unified_diff_detects_generated_hunks():
+    diff = textwrap.dedent("""\
+        diff --git a/out.js b/out.js
+        new file mode 100644
+        --- /dev/null
+        +++ b/out.js
+        @@ -0,0 +1 @@
+        +%s
+        diff --git a/api.py b/api.py
+        new file mode 100644
+        --- /dev/null
+        +++ b/api.py
+        @@ -0,0 +1,2 @@
+        +# %s by tool
+        +x = 1
+    """) % ("var a=1;" * 200, "@" + "generated")
+    bundle, api = parse_unified_diff(diff.splitlines())
+    assert (bundle.excluded, bundle.hunks, bundle.added) == (True, [], 1)
+    assert (api.excluded, api.hunks, api.added) == (True, [], 2)
+
+
+def test_long_prose_lines_and_marker_mentions_stay_in_diff(tmp_path, git):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-b", "main")
+    (repo / "tool.py").write_text('"""Tool."""\n')
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "base")
+    paragraph = "Scratchbot plans docs. " * 55
+    (repo / "README.md").write_text(f"# Title\n\n{paragraph}\n")
+    (repo / "tool.py").write_text(
+        '"""Tool.\n\nOutput files start with "@' 'generated"; DO NOT ' 'EDIT them.\n"""\n'
+    )
+    (repo / "new_tool.py").write_text('"""Writes a Code generated ' 'by header."""\n\n\ndef run():\n    pass\n')
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "docs")
+
+    context = assemble_context(repo, base_ref="HEAD~1", config=ScratchbotConfig())
+    assert not any(f.excluded for f in context["diff_files"])
+    assert paragraph.strip() in context["diff"]
+    assert "DO NOT " "EDIT them" in context["diff"]
+    assert "+def run():" in context["diff"]
+
+
+def test_quoted_paths_are_unquoted(tmp_path, git):
+    files = list(parse_unified_diff([
+        'diff --git "a/caf\\303\\251.py" "b/caf\\303\\251.py"',
+        'diff --git a/old name.py "b/new\\tname.py"',
+        'rename from old name.py',
+        'rename to "new\\tname.py"',
+    ]))
+    assert [(f.path, f.old_path) for f in files] == [("café.py", None), ("new\tname.py", "old name.py")]
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-b", "main")
+    (repo / "mod.py").write_text("x = 1\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "base")
+    (repo / "café.py").write_text("def crème():\n    pass\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-m", "add")
+    context = assemble_context(repo, base_ref="HEAD~1", config=ScratchbotConfig())
+    assert [f.path for f in context["diff_files"]] == ["café.py"]
+    assert "diff --git a/café.py b/café.py" in context["diff"]
+    assert [s.path for s in context["summaries"]] == ["café.py"]
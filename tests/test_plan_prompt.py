@@ -1,7 +1,30 @@
+from http.server import BaseHTTPRequestHandler
 from types import SimpleNamespace
+import asyncio
+import json
 import sys
+import threading
+import time
 
-from scratchbot.plan_prompt import call_openai, generate_docs_plan
+import pytest
+
+from scratchbot.plan_prompt import (
+    HTTPTransport,
+    ModelClient,
+    TokenBucket,
+    TransientModelError,
+    call_openai,
+    generate_docs_plan,
+    get_model_client,
+    reset_model_client,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_model_client():
+    reset_model_client()
+    yield
+    reset_model_client()
 
 
 def test_call_openai_stub(tmp_path, monkeypatch):
@@ -21,7 +44,8 @@ def test_call_openai_defaults_to_gpt5(monkeypatch):
             return SimpleNamespace(output_text="ok")
 
     class DummyClient:
-        def __init__(self):
+        def __init__(self, **kwargs):
+            capture["client_kwargs"] = kwargs
             self.responses = DummyResponses()
 
     monkeypatch.setitem(sys.modules, "openai", SimpleNamespace(OpenAI=DummyClient))
@@ -29,6 +53,7 @@ def test_call_openai_defaults_to_gpt5(monkeypatch):
     monkeypatch.delenv("OPENAI_MODEL", raising=False)
     assert call_openai("hi") == "ok"
     assert capture["model"] == "gpt-5"
+    assert capture["client_kwargs"] == {"max_retries": 0}
 
 
 def test_generate_docs_plan_defaults_to_call_openai(tmp_path, monkeypatch):
@@ -37,3 +62,119 @@ def test_generate_docs_plan_defaults_to_call_openai(tmp_path, monkeypatch):
     monkeypatch.setenv("SCRATCHBOT_PLAN_JSON", str(stub))
     context = {"diff": "", "file_tree": "", "summaries": []}
     assert generate_docs_plan(context) == {"missing": ["a"], "needs_update": []}
+
+
+@pytest.fixture
+def model_server(local_server):
+    state = {"hits": 0, "failures": 0, "status": 503, "latency": 0.0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                state["hits"] += 1
+                fail = state["failures"] > 0
+                if fail:
+                    state["failures"] -= 1
+            time.sleep(state["latency"])
+            if fail:
+                self.send_response(state["status"])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            payload = json.dumps({"output": [{"type": "message", "content": [
+                {"type": "output_text", "text": f"echo:{body['model']}:{body['input']}"}
+            ]}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    state["url"] = local_server(Handler) + "/v1"
+    return state
+
+
+def test_model_client_retries_transient_errors(model_server):
+    model_server["failures"] = 2
+    sleeps = []
+    client = ModelClient(HTTPTransport(model_server["url"]), model="m", sleep=sleeps.append)
+    assert client.complete("hi") == "echo:m:hi"
+    assert model_server["hits"] == 3
+    assert len(sleeps) == 2
+
+
+def test_model_client_does_not_retry_conflicts(model_server):
+    model_server["failures"] = 1
+    model_server["status"] = 409
+    client = ModelClient(HTTPTransport(model_server["url"]), model="m", sleep=lambda s: None)
+    with pytest.raises(Exception) as excinfo:
+        client.complete("hi")
+    assert not isinstance(excinfo.value, TransientModelError)
+    assert model_server["hits"] == 1
+
+
+def test_reset_model_client_rereads_environment(model_server, monkeypatch):
+    monkeypatch.delenv("SCRATCHBOT_PLAN_JSON", raising=False)
+    monkeypatch.setenv("OPENAI_MODEL", "m")
+    first = get_model_client()
+    assert get_model_client() is first
+    monkeypatch.setenv("SCRATCHBOT_MODEL_URL", model_server["url"])
+    reset_model_client()
+    assert get_model_client() is not first
+    assert call_openai("hi") == "echo:m:hi"
+
+
+def test_model_client_gives_up_after_max_retries(model_server):
+    model_server["failures"] = 5
+    client = ModelClient(HTTPTransport(model_server["url"]), model="m", max_retries=1, sleep=lambda s: None)
+    with pytest.raises(TransientModelError):
+        client.complete("hi")
+    assert model_server["hits"] == 2
+
+
+def test_model_client_does_not_retry_other_errors():
+    calls = []
+
+    def transport(model, prompt):
+        calls.append(prompt)
+        raise ValueError("bad request")
+
+    client = ModelClient(transport, model="m", sleep=lambda s: None)
+    with pytest.raises(ValueError):
+        client.complete("hi")
+    assert len(calls) == 1
+
+
+def test_model_client_coalesces_identical_prompts(model_server):
+    model_server["latency"] = 0.2
+    client = ModelClient(HTTPTransport(model_server["url"]), model="m")
+
+    async def run():
+        return await asyncio.gather(
+            client.acomplete("same"), client.acomplete("same"), client.acomplete("other")
+        )
+
+    assert asyncio.run(run()) == ["echo:m:same", "echo:m:same", "echo:m:other"]
+    assert model_server["hits"] == 2
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(60, clock=lambda: now[0], sleep=sleep)
+    bucket.acquire(60)
+    assert sleeps == []
+    bucket.acquire(30)
+    assert sleeps == [pytest.approx(30.0)]
+    bucket.acquire(500)  # clamped to capacity
+    assert sum(sleeps) == pytest.approx(90.0)
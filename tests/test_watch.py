@@ -0,0 +1,187 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from scratchbot.analyze import RepoState, analyze_repo
+from scratchbot.watch import InotifyWatcher, PollingWatcher, watch_repo
+
+
+def _normalize(result):
+    result = dict(result)
+    result['python'] = sorted(result['python'], key=lambda d: d['path'])
+    return result
+
+
+def test_update_matches_full_scan(tmp_path):
+    pkg = tmp_path / 'pkg'
+    pkg.mkdir()
+    (pkg / 'a.py').write_text('def a():\n    pass\n')
+    (pkg / 'b.py').write_text('\n'.join('x = 1' for _ in range(301)))
+    (tmp_path / 'gone.py').write_text('def gone():\n    pass\n')
+    state = RepoState(str(tmp_path))
+    state.scan()
+    assert 'pkg' in state.result()['missing_docs']
+
+    (pkg / 'a.py').write_text('def a(x):\n    pass\n')
+    (pkg / 'README.md').write_text('docs')
+    (tmp_path / 'gone.py').unlink()
+    sub = tmp_path / 'sub'
+    sub.mkdir()
+    (sub / 'c.py').write_text('class C:\n    pass\n')
+    touched = state.update(['pkg/a.py', 'pkg/README.md', 'gone.py', str(sub)])
+
+    assert set(touched) == {'pkg/a.py', 'pkg/README.md', 'gone.py', 'sub/c.py'}
+    assert _normalize(state.result()) == _normalize(analyze_repo(str(tmp_path)))
+    assert 'pkg' not in state.result()['missing_docs']
+
+
+def test_update_refreshes_baseline_diff(tmp_path):
+    (tmp_path / 'mod.py').write_text('def f(a):\n    pass\n')
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'functions': {'mod.py': {'f': '(a)'}}}))
+    state = RepoState(str(tmp_path), str(baseline))
+    state.scan()
+    assert state.result()['needs_update'] == []
+
+    (tmp_path / 'mod.py').write_text('def f(a,b):\n    pass\n')
+    state.update(['mod.py'])
+    assert state.result()['needs_update'] == [
+        {'path': 'mod.py', 'reason': 'function signature changed for f'}
+    ]
+
+
+def test_update_keeps_previous_result_on_syntax_error(tmp_path):
+    (tmp_path / 'mod.py').write_text('def f():\n    pass\n')
+    state = RepoState(str(tmp_path))
+    state.scan()
+    (tmp_path / 'mod.py').write_text('def f(:\n')
+    assert state.update(['mod.py']) == []
+    assert state.result()['python'][0]['exports']['functions'][0]['name'] == 'f'
+
+
+def test_polling_watcher_reports_changes(tmp_path):
+    (tmp_path / 'a.py').write_text('x = 1\n')
+    watcher = PollingWatcher(str(tmp_path))
+    (tmp_path / 'a.py').write_text('x = 1\ny = 2\n')
+    (tmp_path / 'b.py').write_text('z = 3\n')
+    changed = watcher.wait(0)
+    assert changed == {str(tmp_path / 'a.py'), str(tmp_path / 'b.py')}
+    assert watcher.wait(0) == set()
+
+
+def test_inotify_watcher_reports_changes(tmp_path):
+    try:
+        watcher = InotifyWatcher(str(tmp_path))
+    except OSError:
+        pytest.skip('inotify not available')
+    try:
+        sub = tmp_path / 'sub'
+        sub.mkdir()
+        assert str(sub) in watcher.wait(1)
+        (sub / 'a.py').write_text('x = 1\n')
+        assert str(sub / 'a.py') in watcher.wait(1)
+    finally:
+        watcher.close()
+
+
+def test_watch_repo_serves_and_emits(tmp_path):
+    (tmp_path / 'a.py').write_text('def a():\n    pass\n')
+    sock_path = str(tmp_path / 'scratchbot.sock')
+    results = []
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=watch_repo,
+        args=(str(tmp_path),),
+        kwargs={'interval': 0.05, 'socket_path': sock_path, 'force_poll': True,
+                'emit': results.append, 'stop': stop},
+    )
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not results and time.monotonic() < deadline:
+            time.sleep(0.01)
+        (tmp_path / 'b.py').write_text('def b():\n    pass\n')
+        while len(results) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(results) == 2
+        assert {d['path'] for d in results[-1]['python']} == {'a.py', 'b.py'}
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(sock_path)
+        chunks = []
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        client.close()
+        assert json.loads(b''.join(chunks)) == results[-1]
+    finally:
+        stop.set()
+        thread.join(5)
+
+
+def test_update_ignores_new_vendored_directories(tmp_path):
+    (tmp_path / 'a.py').write_text('def a():\n    pass\n')
+    state = RepoState(str(tmp_path))
+    state.scan()
+    for vendored in ('node_modules/foo', '.venv/lib'):
+        (tmp_path / vendored).mkdir(parents=True)
+        (tmp_path / vendored / 'm.py').write_text('def m():\n    pass\n')
+    assert state.update([str(tmp_path / 'node_modules'), str(tmp_path / '.venv')]) == []
+    assert [d['path'] for d in state.result()['python']] == ['a.py']
+
+
+def test_inotify_watcher_ignores_vendored_directories(tmp_path):
+    try:
+        watcher = InotifyWatcher(str(tmp_path))
+    except OSError:
+        pytest.skip('inotify not available')
+    try:
+        (tmp_path / 'node_modules').mkdir()
+        (tmp_path / 'src').mkdir()
+        assert watcher.wait(1) == {str(tmp_path / 'src')}
+    finally:
+        watcher.close()
+
+
+def test_update_drops_skipped_files_of_removed_directory(tmp_path):
+    pkg = tmp_path / 'pkg'
+    pkg.mkdir()
+    (pkg / 'a.py').write_text('def a():\n    pass\n')
+    (pkg / 'b.js').write_bytes(b'\x00\x01binary')
+    (pkg / 'c.py').write_text('# @' + 'generated\nx = 1\n')
+    state = RepoState(str(tmp_path))
+    state.scan()
+    assert len(state.result()['skipped']) == 2
+    for child in pkg.iterdir():
+        child.unlink()
+    pkg.rmdir()
+    assert set(state.update([str(pkg)])) == {'pkg/a.py', 'pkg/b.js', 'pkg/c.py'}
+    assert _normalize(state.result()) == _normalize(analyze_repo(str(tmp_path)))
+
+
+def test_update_treats_vanished_file_as_removed(tmp_path, monkeypatch):
+    (tmp_path / 'a.py').write_text('def a():\n    pass\n')
+    state = RepoState(str(tmp_path))
+    state.scan()
+
+    def vanish(path, max_size=None):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr('scratchbot.analyze.scan_file', vanish)
+    assert state.update(['a.py']) == ['a.py']
+    assert state.result()['python'] == []
+
+
+def test_update_reports_dependency_file_changes(tmp_path):
+    (tmp_path / 'requirements.txt').write_text('requests\n')
+    state = RepoState(str(tmp_path))
+    state.scan()
+    assert state.result()['dependencies'] == {'pip': ['requests']}
+    (tmp_path / 'requirements.txt').write_text('requests\nflask\n')
+    assert state.update([str(tmp_path / 'requirements.txt')]) == ['requirements.txt']
+    assert state.result()['dependencies'] == {'pip': ['requests', 'flask']}